@@ -13,17 +13,73 @@ OUTPUT_DIRS = {
     'audio': 'output/audio',
     'transcripts': 'output/transcripts',
     'reports': 'output/reports',
-    'clips': 'output/clips'
+    'clips': 'output/clips',
+    'thumbnails': 'output/thumbnails'
 }
 
 # Whisper settings
 WHISPER_MODEL = 'small'  # Options: tiny, small, medium, large
 
+# Clip loudness normalization (EBU R128, single-pass linear loudnorm)
+NORMALIZE_LOUDNESS = True
+LOUDNESS_TARGET_I = -14.0  # LUFS (YouTube playback reference)
+LOUDNESS_TARGET_TP = -1.0  # dBTP
+LOUDNESS_TARGET_LRA = 11.0  # LU
+
+# Burned-in captions
+CAPTION_FONT = 'Arial'
+CAPTION_WORDS_PER_LINE = 3
+CAPTION_MAX_GAP = 0.6  # seconds of silence that starts a new caption line
+
+# Thumbnails: one frame per clip, picked from candidates sampled this often
+GENERATE_THUMBNAILS = True
+THUMBNAIL_SAMPLE_INTERVAL = 0.5  # seconds
+
+# Low-memory mode for multi-hour recordings (--low-memory)
+LOW_MEMORY = False
+MEMORY_BUDGET_MB = 2048  # resident memory budget for the whole process
+LOW_MEMORY_WINDOW_SECONDS = 300  # longest audio window transcribed at once
+
+# Voice activity pre-pass: only send detected speech to Whisper
+VAD_PREPASS = False
+
+# Audio fingerprint index for reusing transcripts of re-uploaded footage
+AUDIO_DEDUP = True
+FINGERPRINT_DB = 'output/fingerprints.db'
+
+# Full-text index of transcripts and reports for --search
+LIBRARY_DB = 'output/library.db'
+
 # Clip constraints
 MAX_CLIPS = 5
 CLIP_MIN_DURATION = 15  # seconds
 CLIP_MAX_DURATION = 60  # seconds
 
+# Claude API limits (shared by all requests in this process)
+LLM_MAX_CONCURRENCY = 4  # requests in flight at once
+LLM_REQUESTS_PER_MINUTE = 50
+LLM_TOKENS_PER_MINUTE = 40000  # input + output
+LLM_MAX_RETRIES = 6  # retries on 429/529 and transient errors
+LLM_BACKOFF_BASE = 1.0  # seconds, doubled per retry (with jitter)
+LLM_BACKOFF_MAX = 60.0  # seconds
+PROMPT_CACHING = True  # send the transcript once as a cached prefix for both requests
+
+# Distributed worker settings (shared job directory, e.g. on NFS)
+JOBS_DIR = 'jobs'
+LEASE_TTL = 60  # seconds a job lease survives without a heartbeat
+HEARTBEAT_INTERVAL = 15  # seconds between lease renewals
+WORKER_POLL_INTERVAL = 5  # seconds to wait when the queue is empty
+
+# Live metrics (--metrics-port / --metrics-log)
+METRICS_PORT = None  # serve Prometheus text on this port; None = off
+METRICS_HOST = '127.0.0.1'  # interface for the metrics port; '0.0.0.0' for remote scrapes
+# JSON Lines metrics snapshots; None = off. Workers write one file each
+# ({worker_id} is hostname-pid) so they don't append to the same file on NFS,
+# while single runs keep appending to one file instead of leaving one per run
+METRICS_LOG = 'output/metrics.jsonl'
+METRICS_WORKER_LOG = 'output/metrics_{worker_id}.jsonl'
+METRICS_LOG_INTERVAL = 30  # seconds between snapshots
+
 
 def get_api_key():
     """
@@ -6,8 +6,13 @@ for creating YouTube Shorts using AI (Whisper + Claude).
 """
 
 import argparse
+import contextlib
+import json
 import os
+import sqlite3
 import sys
+import time
+import wave
 import tkinter as tk
 from tkinter import filedialog
 from config import (
@@ -17,14 +22,55 @@ from config import (
     WHISPER_MODEL,
     MAX_CLIPS,
     CLIP_MIN_DURATION,
-    CLIP_MAX_DURATION
+    CLIP_MAX_DURATION,
+    JOBS_DIR,
+    LEASE_TTL,
+    HEARTBEAT_INTERVAL,
+    WORKER_POLL_INTERVAL,
+    PROMPT_CACHING,
+    NORMALIZE_LOUDNESS,
+    AUDIO_DEDUP,
+    VAD_PREPASS,
+    FINGERPRINT_DB,
+    LIBRARY_DB,
+    GENERATE_THUMBNAILS,
+    LOW_MEMORY,
+    MEMORY_BUDGET_MB,
+    LOW_MEMORY_WINDOW_SECONDS,
+    METRICS_PORT,
+    METRICS_HOST,
+    METRICS_LOG,
+    METRICS_WORKER_LOG,
+    METRICS_LOG_INTERVAL
 )
 from src.video_processor import extract_audio, check_ffmpeg_installed
-from src.transcriber import transcribe_audio, save_transcript
+from src.loudness import load_loudness
+from src.transcriber import transcribe_audio, transcribe_low_memory, save_transcript
+from src.memory_budget import peak_rss_mb
+from src.audio_fingerprint import (
+    compute_fingerprint,
+    open_index,
+    add_to_index,
+    find_match,
+    reuse_transcript
+)
+from src.voice_activity import detect_speech_regions, total_duration
 from src.highlight_analyzer import analyze_highlights
-from src.report_generator import generate_json_report, generate_text_report
-from src.clip_generator import generate_all_clips
+from src.report_generator import generate_json_report, generate_text_report, format_duration
+from src.clip_generator import generate_all_clips, OUTPUT_PROFILES
 from src.video_metadata_generator import generate_video_metadata
+from src.thumbnail_generator import generate_thumbnails
+from src.job_queue import submit_job, run_worker, count_jobs, default_worker_id
+from src.library_index import open_library, update_library, search_library
+from src.llm_gateway import metrics as llm_metrics
+from src.metrics import registry as metrics_registry, start_metrics_server, MetricsLogger, timed_stage
+
+# Options a submitter records on a job so every worker processes it the same way
+JOB_OPTION_KEYS = (
+    'max_clips', 'min_duration', 'max_duration',
+    'whisper_model', 'skip_cutting', 'vertical', 'vad', 'formats', 'captions',
+    'loudnorm', 'thumbnails', 'low_memory', 'memory_budget', 'dedup', 'prompt_cache'
+)
 
 
 def check_dependencies():
@@ -95,41 +141,145 @@ def run_pipeline(video_path: str, args):
 
     # Validate video file
     if not os.path.exists(video_path):
-        print(f"❌ Error: Video file not found: {video_path}")
-        sys.exit(1)
+        raise FileNotFoundError(f"Video file not found: {video_path}")
 
     video_name = os.path.splitext(os.path.basename(video_path))[0]
+    llm_mark = llm_metrics.mark()
     print(f"\n✓ Video loaded: {os.path.basename(video_path)}")
 
     # Step 1: Extract audio
     print("\n⏳ Extracting audio...")
     audio_path = os.path.join(OUTPUT_DIRS['audio'], f"{video_name}_audio.wav")
-    extract_audio(video_path, audio_path)
+    loudness_path = os.path.join(OUTPUT_DIRS['audio'], f"{video_name}_loudness.json")
+    with timed_stage('extract_audio'):
+        extract_audio(video_path, audio_path, loudness_path if args.loudnorm else None)
+    with wave.open(audio_path, 'rb') as wav:
+        audio_duration = wav.getnframes() / wav.getframerate()
     print("✓ Audio extraction complete")
 
-    # Step 2: Transcribe
-    print(f"\n⏳ Transcribing with Whisper ({args.whisper_model} model)...")
-    print("   (First run will download the model, this may take a few minutes)")
-    transcript = transcribe_audio(audio_path, args.whisper_model)
+    # Step 2: Transcribe (reusing an earlier transcript if the audio was seen before)
+    transcript = None
+    speech_regions = None
     transcript_path = os.path.join(OUTPUT_DIRS['transcripts'], f"{video_name}_transcript.json")
+    # Low-memory mode streams segments here while transcribing
+    segments_path = os.path.join(OUTPUT_DIRS['transcripts'], f"{video_name}_segments.jsonl")
+
+    if args.vad:
+        print("\n⏳ Detecting speech...")
+        with timed_stage('vad', audio_duration):
+            speech_regions = detect_speech_regions(audio_path)
+        speech_duration = total_duration(speech_regions)
+        skipped = 1 - speech_duration / audio_duration if audio_duration else 0
+        print(f"✓ {len(speech_regions)} speech regions, {speech_duration:.0f}s of "
+              f"{audio_duration:.0f}s ({skipped:.0%} of audio skipped)")
+
+    fingerprint_index = None
+    if args.dedup:
+        print("\n⏳ Fingerprinting audio...")
+        with timed_stage('fingerprint', audio_duration):
+            fingerprint = compute_fingerprint(audio_path)
+            try:
+                fingerprint_index = open_index(FINGERPRINT_DB)
+                match = find_match(fingerprint_index, fingerprint, args.whisper_model)
+            except sqlite3.Error as e:
+                # The index only saves work; never fail the video over it
+                print(f"⚠ Fingerprint index unavailable ({e}), transcribing from scratch")
+                if fingerprint_index is not None:
+                    fingerprint_index.close()
+                fingerprint_index = None
+                match = None
+
+        reusable = bool(match and os.path.exists(match['transcript_path']))
+        metrics_registry.inc('dedup_lookups_total', 1, 'Fingerprint index lookups')
+        metrics_registry.inc('dedup_hits_total', int(reusable), 'Lookups that reused an earlier transcript')
+        metrics_registry.set(
+            'dedup_hit_ratio',
+            metrics_registry.get('dedup_hits_total') / metrics_registry.get('dedup_lookups_total'),
+            'Share of videos whose transcript was reused'
+        )
+
+        if reusable:
+            shared = total_duration(match['covered'])
+            print(f"✓ Audio matches '{match['video_name']}' "
+                  f"(offset {match['offset']:+.2f}s, {shared:.0f}s of {audio_duration:.0f}s shared)")
+            with open(match['transcript_path'], 'r', encoding='utf-8') as f:
+                previous = json.load(f)
+            with timed_stage('transcribe', audio_duration):
+                transcript = reuse_transcript(
+                    match, previous, audio_path, fingerprint['duration'], args.whisper_model,
+                    speech_regions=speech_regions,
+                    word_timestamps=args.captions,
+                    memory_budget_mb=args.memory_budget if args.low_memory else None,
+                    segments_path=segments_path,
+                    max_window_seconds=LOW_MEMORY_WINDOW_SECONDS
+                )
+            print("✓ Reused earlier transcript")
+        else:
+            print("✓ No earlier upload of this audio found")
+
+    if transcript is None:
+        print(f"\n⏳ Transcribing with Whisper ({args.whisper_model} model)...")
+        print("   (First run will download the model, this may take a few minutes)")
+        started = time.monotonic()
+        with timed_stage('transcribe', audio_duration):
+            if args.low_memory:
+                transcript = transcribe_low_memory(
+                    audio_path,
+                    args.whisper_model,
+                    args.memory_budget,
+                    segments_path,
+                    speech_regions=speech_regions,
+                    word_timestamps=args.captions,
+                    max_window_seconds=LOW_MEMORY_WINDOW_SECONDS
+                )
+            else:
+                transcript = transcribe_audio(
+                    audio_path,
+                    args.whisper_model,
+                    speech_regions=speech_regions,
+                    word_timestamps=args.captions
+                )
+        elapsed = time.monotonic() - started
+        print(f"✓ Transcription complete ({elapsed:.0f}s)")
+        if speech_regions is not None and speech_duration and elapsed > 0:
+            # Only the amount of audio is known; time without --vad isn't measured
+            print(f"   Whisper ran on {speech_duration:.0f}s of {audio_duration:.0f}s of audio "
+                  f"({speech_duration / audio_duration:.0%}), at {speech_duration / elapsed:.1f}x realtime")
+
     save_transcript(transcript, transcript_path)
-    print("✓ Transcription complete")
+    if os.path.exists(segments_path):
+        os.remove(segments_path)
+
+    if fingerprint_index is not None:
+        try:
+            add_to_index(fingerprint_index, video_name, fingerprint, transcript_path, args.whisper_model)
+        except sqlite3.Error as e:
+            print(f"⚠ Could not add video to the fingerprint index ({e})")
+        fingerprint_index.close()
 
     # Step 3A: Generate full video metadata
     print(f"\n⏳ Generating full video metadata with Claude AI...")
-    video_metadata = generate_video_metadata(transcript, video_name)
+    with timed_stage('video_metadata'):
+        video_metadata = generate_video_metadata(
+            transcript,
+            video_name,
+            use_prompt_cache=args.prompt_cache
+        )
     print(f"✓ Video metadata generated")
     print(f"   Title: {video_metadata['title']}")
     print(f"   Category: {video_metadata['category']}")
 
     # Step 3B: Analyze highlights
     print(f"\n⏳ Analyzing highlights with Claude AI...")
-    clips = analyze_highlights(
-        transcript,
-        max_clips=args.max_clips,
-        min_duration=args.min_duration,
-        max_duration=args.max_duration
-    )
+    with timed_stage('highlights'):
+        clips = analyze_highlights(
+            transcript,
+            max_clips=args.max_clips,
+            min_duration=args.min_duration,
+            max_duration=args.max_duration,
+            video_name=video_name,
+            use_prompt_cache=args.prompt_cache
+        )
     print(f"✓ Found {len(clips)} potential clips")
 
     # Display clips
@@ -186,15 +336,181 @@ def run_pipeline(video_path: str, args):
 
     # Step 5: Cut clips (optional)
     if not args.skip_cutting:
-        clip_paths = generate_all_clips(video_path, clips, OUTPUT_DIRS['clips'], vertical=args.vertical)
-        format_info = " (vertical 9:16)" if args.vertical else ""
+        with timed_stage('clips', sum(clip['end_time'] - clip['start_time'] for clip in clips)):
+            clip_paths = generate_all_clips(
+                video_path,
+                clips,
+                OUTPUT_DIRS['clips'],
+                vertical=args.vertical,
+                profiles=args.formats,
+                transcript=transcript if args.captions else None,
+                loudness=load_loudness(loudness_path) if args.loudnorm else None
+            )
+        if args.formats:
+            format_info = " (" + ", ".join(OUTPUT_PROFILES[name]['label'] for name in args.formats) + ")"
+        else:
+            format_info = " (vertical 9:16)" if args.vertical else ""
         print(f"\n✓ {len(clip_paths)} clips saved to {OUTPUT_DIRS['clips']}/{format_info}")
     else:
         print("\n⏭  Skipped video cutting (--skip-cutting flag)")
 
+    # Step 6: Thumbnails (optional, rendered from the video like the clips)
+    if args.thumbnails and not args.skip_cutting:
+        with timed_stage('thumbnails'):
+            thumbnail_paths = generate_thumbnails(video_path, clips, OUTPUT_DIRS['thumbnails'])
+        if thumbnail_paths:
+            print(f"\n✓ {len(thumbnail_paths)} thumbnails saved to {OUTPUT_DIRS['thumbnails']}/")
+        else:
+            print("\n⚠ No thumbnails were created")
+    elif args.thumbnails:
+        print("⏭  Skipped thumbnails (--skip-cutting flag)")
+
+    llm = llm_metrics.summary(since=llm_mark)
+    print(f"\n📊 Claude API: {llm['calls']} calls, {llm['retries']} retries, "
+          f"{llm['latency_total']:.1f}s total latency")
+    print(f"   Input tokens: {llm['input_tokens']} uncached, "
+          f"{llm['cache_creation_input_tokens']} written to cache, "
+          f"{llm['cache_read_input_tokens']} read from cache")
+    print(f"   Output tokens: {llm['output_tokens']}")
+
+    if args.low_memory:
+        peak = peak_rss_mb()
+        if peak is not None:
+            print(f"📊 Peak memory: {peak:.0f} MB (budget {args.memory_budget} MB)")
+
+    metrics_registry.inc('videos_processed_total', 1, 'Videos that completed the pipeline')
+    metrics_registry.inc('media_seconds_processed_total', audio_duration, 'Source seconds that completed the pipeline')
     print("\n✅ Complete!\n")
 
 
+def parse_formats(value: str) -> list:
+    """
+    Parse the --formats option into a list of clip output profile names.
+
+    Args:
+        value: Comma-separated profile names, e.g. "vertical,square"
+
+    Returns:
+        List of profile names in the given order
+
+    Raises:
+        argparse.ArgumentTypeError: If a name is not a known profile
+    """
+    names = [name.strip() for name in value.split(',') if name.strip()]
+    unknown = [name for name in names if name not in OUTPUT_PROFILES]
+    if unknown or not names:
+        raise argparse.ArgumentTypeError(
+            f"unknown format(s) {', '.join(unknown) or value!r}; "
+            f"choose from {', '.join(OUTPUT_PROFILES)}"
+        )
+    return list(dict.fromkeys(names))
+
+
+def run_worker_mode(args):
+    """
+    Process videos claimed from the shared job directory until stopped.
+
+    Args:
+        args: Parsed command-line arguments (job options override these)
+    """
+    metrics_registry.add_collector(lambda: [
+        ('jobs', 'gauge', count, {'state': state})
+        for state, count in count_jobs(args.jobs_dir).items()
+    ])
+    # SQLite locking is unreliable on NFS, where workers usually share output/
+    print("ℹ Re-upload detection (dedup) is off in worker mode")
+
+    def process_job(job):
+        job_args = argparse.Namespace(**vars(args))
+        for key, value in job.get('options', {}).items():
+            if key in JOB_OPTION_KEYS:
+                setattr(job_args, key, value)
+        job_args.dedup = False
+        run_pipeline(job['video_path'], job_args)
+
+    completed = run_worker(
+        args.jobs_dir,
+        process_job,
+        lease_ttl=LEASE_TTL,
+        heartbeat_interval=HEARTBEAT_INTERVAL,
+        poll_interval=WORKER_POLL_INTERVAL,
+        exit_when_idle=args.exit_when_idle
+    )
+    print(f"\n✅ Worker finished {completed} job(s)\n")
+
+
+def run_search_mode(args):
+    """
+    Search the library of past runs and optionally render one result.
+
+    Args:
+        args: Parsed command-line arguments
+    """
+    library = open_library(LIBRARY_DB)
+    counts = update_library(library, [OUTPUT_DIRS['transcripts'], OUTPUT_DIRS['reports']])
+    if counts['indexed'] or counts['removed']:
+        print(f"✓ Library updated: {counts['indexed']} files indexed, "
+              f"{counts['removed']} removed, {counts['unchanged']} unchanged")
+
+    started = time.monotonic()
+    results = search_library(library, args.search, limit=args.search_limit)
+    elapsed_ms = (time.monotonic() - started) * 1000
+    library.close()
+
+    print(f"\n🔍 {len(results)} matches for \"{args.search}\" ({elapsed_ms:.0f} ms)")
+    for i, result in enumerate(results, 1):
+        if result['start_time'] is None:
+            when = "--:--"
+        elif result['end_time'] is None:
+            when = format_duration(result['start_time'])
+        else:
+            when = f"{format_duration(result['start_time'])} - {format_duration(result['end_time'])}"
+        print(f"\n  {i}. {result['video_name']}  {when}  [{result['kind']}]")
+        print(f"     {result['snippet']}")
+
+    if not args.render:
+        return
+    if not 1 <= args.render <= len(results):
+        print(f"\n❌ --render {args.render}: no such result")
+        sys.exit(1)
+
+    result = results[args.render - 1]
+    video_path = args.video_path or result['video_path']
+    if not video_path or not os.path.exists(video_path):
+        print(f"\n❌ Source video for '{result['video_name']}' not found; pass its path as well")
+        sys.exit(1)
+    if result['start_time'] is None:
+        print(f"\n❌ Result {args.render} has no timestamp to render")
+        sys.exit(1)
+
+    # Transcript lines and chapters are short; extend them to a usable clip length
+    start_time = result['start_time']
+    end_time = max(result['end_time'] or start_time, start_time + args.min_duration)
+    end_time = min(end_time, start_time + args.max_duration)
+
+    video_name = result['video_name']
+    transcript = None
+    transcript_path = os.path.join(OUTPUT_DIRS['transcripts'], f"{video_name}_transcript.json")
+    if args.captions and os.path.exists(transcript_path):
+        with open(transcript_path, 'r', encoding='utf-8') as f:
+            transcript = json.load(f)
+    loudness_path = os.path.join(OUTPUT_DIRS['audio'], f"{video_name}_loudness.json")
+    loudness = load_loudness(loudness_path) if args.loudnorm and os.path.exists(loudness_path) else None
+
+    clip_paths = generate_all_clips(
+        video_path,
+        [{'start_time': start_time, 'end_time': end_time}],
+        OUTPUT_DIRS['clips'],
+        vertical=args.vertical,
+        profiles=args.formats,
+        transcript=transcript,
+        loudness=loudness,
+        name=f"{video_name}_at_{int(start_time // 60):02d}m{int(start_time % 60):02d}s"
+    )
+    for path in clip_paths:
+        print(f"✓ Saved {path}")
+
+
 def main():
     """Main entry point with argument parsing."""
 
@@ -209,6 +525,12 @@ Examples:
   python main.py video.mp4 --max-clips 3 --skip-cutting
   python main.py video.mp4 --whisper-model medium --max-duration 45 --vertical
   python main.py "path/with spaces/video.mp4" --max-clips 5
+  python main.py video.mp4 --formats horizontal,vertical,square
+  python main.py video.mp4 --vertical --captions
+  python main.py video.mp4 --submit --vertical  (queue for worker nodes)
+  python main.py --worker                       (process queued videos)
+  python main.py --search "pricing mistake"     (search past transcripts/reports)
+  python main.py --search "pricing mistake" --render 1 --vertical
 
 For more information, see README.md
         """
@@ -251,7 +573,7 @@ For more information, see README.md
     parser.add_argument(
         '--skip-cutting',
         action='store_true',
-        help='Skip video cutting, only generate reports'
+        help='Skip video cutting and thumbnails, only generate reports'
     )
 
     parser.add_argument(
@@ -260,12 +582,182 @@ For more information, see README.md
         help='Convert clips to vertical 9:16 format (1080x1920) with blurred background for phone screens'
     )
 
+    parser.add_argument(
+        '--formats',
+        type=parse_formats,
+        help='Comma-separated output formats rendered from one decode per clip: '
+             'horizontal (16:9), vertical (9:16), square (1:1). Overrides --vertical'
+    )
+
+    parser.add_argument(
+        '--no-loudnorm',
+        dest='loudnorm',
+        action='store_false',
+        default=NORMALIZE_LOUDNESS,
+        help='Keep the source loudness instead of normalizing clip audio (EBU R128)'
+    )
+
+    parser.add_argument(
+        '--captions',
+        action='store_true',
+        help='Burn word-timed captions from the transcript into each clip'
+    )
+
+    parser.add_argument(
+        '--no-thumbnails',
+        dest='thumbnails',
+        action='store_false',
+        default=GENERATE_THUMBNAILS,
+        help='Skip picking and rendering a thumbnail for each clip'
+    )
+
+    parser.add_argument(
+        '--low-memory',
+        action='store_true',
+        default=LOW_MEMORY,
+        help='Transcribe long recordings in memory-mapped windows that fit --memory-budget'
+    )
+
+    parser.add_argument(
+        '--memory-budget',
+        type=int,
+        default=MEMORY_BUDGET_MB,
+        metavar='MB',
+        help=f'Resident memory budget for --low-memory in MB (default: {MEMORY_BUDGET_MB})'
+    )
+
+    parser.add_argument(
+        '--vad',
+        action='store_true',
+        default=VAD_PREPASS,
+        help='Detect speech first and only transcribe speech regions (skips music/silence)'
+    )
+
+    parser.add_argument(
+        '--no-dedup',
+        dest='dedup',
+        action='store_false',
+        default=AUDIO_DEDUP,
+        help='Always transcribe, even if the audio matches an earlier video (always on with --worker)'
+    )
+
+    parser.add_argument(
+        '--no-prompt-cache',
+        dest='prompt_cache',
+        action='store_false',
+        default=PROMPT_CACHING,
+        help='Send the full transcript with each Claude request instead of a shared cached prefix'
+    )
+
+    parser.add_argument(
+        '--jobs-dir',
+        default=JOBS_DIR,
+        help=f'Shared job directory used by --submit and --worker (default: {JOBS_DIR})'
+    )
+
+    parser.add_argument(
+        '--submit',
+        action='store_true',
+        help='Queue the video in the job directory instead of processing it here'
+    )
+
+    parser.add_argument(
+        '--worker',
+        action='store_true',
+        help='Run as a worker: claim and process videos from the job directory'
+    )
+
+    parser.add_argument(
+        '--exit-when-idle',
+        action='store_true',
+        help='With --worker, exit once the job queue is empty'
+    )
+
+    parser.add_argument(
+        '--metrics-port',
+        type=int,
+        default=METRICS_PORT,
+        metavar='PORT',
+        help='Serve live metrics in Prometheus text format on http://HOST:PORT/metrics'
+    )
+
+    parser.add_argument(
+        '--metrics-host',
+        default=METRICS_HOST,
+        metavar='HOST',
+        help=f'Interface for --metrics-port (default: {METRICS_HOST}; 0.0.0.0 allows remote scrapes)'
+    )
+
+    parser.add_argument(
+        '--metrics-log',
+        metavar='PATH',
+        help=f'Append a JSON line of all metrics here every {METRICS_LOG_INTERVAL}s; '
+             f'{{worker_id}} is replaced by hostname-pid (default: {METRICS_LOG}, '
+             f'or {METRICS_WORKER_LOG} with --worker; empty string disables)'
+    )
+
+    parser.add_argument(
+        '--search',
+        metavar='QUERY',
+        help='Search transcripts and reports of earlier runs instead of processing a video'
+    )
+
+    parser.add_argument(
+        '--search-limit',
+        type=int,
+        default=10,
+        help='Maximum number of --search results (default: 10)'
+    )
+
+    parser.add_argument(
+        '--render',
+        type=int,
+        metavar='N',
+        help='With --search, cut result N as a clip (uses --vertical/--formats/--captions)'
+    )
+
     args = parser.parse_args()
 
+    if args.search:
+        create_output_dirs()
+        if args.render and not check_ffmpeg_installed():
+            print("❌ FFmpeg is not installed or not in PATH")
+            sys.exit(1)
+        run_search_mode(args)
+        return
+
+    if args.submit:
+        if not args.video_path:
+            parser.error('--submit requires a video path')
+        options = {key: getattr(args, key) for key in JOB_OPTION_KEYS}
+        job_id = submit_job(args.jobs_dir, args.video_path, options)
+        print(f"✓ Queued job {job_id} in {args.jobs_dir}")
+        return
+
     # Setup
     create_output_dirs()
     check_dependencies()
 
+    if args.metrics_port:
+        start_metrics_server(args.metrics_port, args.metrics_host)
+        print(f"📊 Metrics at http://{args.metrics_host}:{args.metrics_port}/metrics")
+    if args.metrics_log is None:
+        args.metrics_log = METRICS_WORKER_LOG if args.worker else METRICS_LOG
+    if args.metrics_log:
+        metrics_log_path = args.metrics_log.replace('{worker_id}', default_worker_id())
+        metrics_log = MetricsLogger(metrics_log_path, METRICS_LOG_INTERVAL)
+    else:
+        metrics_log = contextlib.nullcontext()
+
+    if args.worker:
+        try:
+            with metrics_log:
+                run_worker_mode(args)
+        except KeyboardInterrupt:
+            print("\n\n⚠ Worker stopped by user")
+            sys.exit(1)
+        return
+
     # Get video path - use GUI file picker if not provided
     video_path = args.video_path
     if not video_path:
@@ -278,7 +770,8 @@ For more information, see README.md
 
     # Run pipeline
     try:
-        run_pipeline(video_path, args)
+        with metrics_log:
+            run_pipeline(video_path, args)
     except KeyboardInterrupt:
         print("\n\n⚠ Interrupted by user")
         sys.exit(1)
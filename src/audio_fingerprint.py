@@ -0,0 +1,494 @@
+"""
+Audio fingerprinting module for spotting re-uploads of the same footage.
+
+Creators often re-export a video with a different container, bitrate or a
+trimmed intro. Byte hashes miss that, but the audio stays the same. This
+module computes a landmark fingerprint (pairs of spectrogram peaks, as used
+by music recognition services) from the 16 kHz WAV made by `extract_audio`,
+stores it in a local SQLite index, and finds earlier videos that share audio
+along with the time offset between them. A match lets the pipeline reuse the
+earlier transcript instead of running Whisper again.
+"""
+
+import os
+import sqlite3
+import wave
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from src.transcriber import (
+    SAMPLE_RATE,
+    shift_segments,
+    merge_segments,
+    transcribe_regions,
+    transcribe_low_memory
+)
+from src.voice_activity import intersect_regions
+
+# Spectrogram: 64 ms windows every 32 ms at 16 kHz
+FRAME_SIZE = 1024
+HOP_SIZE = 512
+SECONDS_PER_FRAME = HOP_SIZE / SAMPLE_RATE
+
+# Peak picking: a peak must be the loudest bin within this neighbourhood
+PEAK_TIME_NEIGHBORHOOD = 11  # frames
+PEAK_FREQ_NEIGHBORHOOD = 21  # frequency bins
+PEAK_MIN_DB_ABOVE_MEAN = 10.0
+
+# Pairing: each peak is paired with the next few peaks up to ~2 s later
+FAN_OUT = 8
+MAX_PAIR_FRAMES = 63  # must fit in 6 bits of the hash
+
+CHUNK_FRAMES = 4096  # frames of spectrogram computed at a time (~2 min)
+
+# Matching thresholds
+MIN_MATCHING_HASHES = 50
+MIN_MATCH_RATIO = 0.01  # share of the hashes in the expected overlap that must line up
+MIN_NEW_REGION = 1.0  # seconds; shorter unmatched gaps are not transcribed
+
+# Timeline check: the overlap is split into windows, and only windows where
+# enough hashes line up at the winning offset count as shared audio. Windows
+# with too few hashes of their own (silence) bridge agreeing neighbours.
+MATCH_WINDOW_SECONDS = 10.0
+MIN_WINDOW_HASHES = 8
+
+# Seconds to wait for another process's write lock before giving up
+INDEX_BUSY_TIMEOUT = 30.0
+
+
+def _read_wav_frames(wav, start_frame: int, n_samples: int) -> np.ndarray:
+    """Read `n_samples` mono int16 samples starting at `start_frame` as float32."""
+    wav.setpos(start_frame)
+    data = np.frombuffer(wav.readframes(n_samples), dtype=np.int16)
+    return data.astype(np.float32) / 32768.0
+
+
+def _spectrogram_db(samples: np.ndarray) -> np.ndarray:
+    """Log-magnitude spectrogram (frames x bins) using Hann-windowed frames."""
+    frames = sliding_window_view(samples, FRAME_SIZE)[::HOP_SIZE]
+    window = np.hanning(FRAME_SIZE).astype(np.float32)
+    magnitude = np.abs(np.fft.rfft(frames * window, axis=1))
+    return 20.0 * np.log10(magnitude + 1e-10)
+
+
+def _local_max(spec: np.ndarray) -> np.ndarray:
+    """Separable 2-D max filter with edge padding."""
+    half_t = PEAK_TIME_NEIGHBORHOOD // 2
+    half_f = PEAK_FREQ_NEIGHBORHOOD // 2
+    padded = np.pad(spec, ((0, 0), (half_f, half_f)), mode='edge')
+    along_freq = sliding_window_view(padded, PEAK_FREQ_NEIGHBORHOOD, axis=1).max(axis=2)
+    padded = np.pad(along_freq, ((half_t, half_t), (0, 0)), mode='edge')
+    return sliding_window_view(padded, PEAK_TIME_NEIGHBORHOOD, axis=0).max(axis=2)
+
+
+def find_peaks(audio_path: str):
+    """
+    Find spectrogram peaks of a 16-bit mono WAV file, chunk by chunk.
+
+    Args:
+        audio_path: Path to WAV file produced by extract_audio
+
+    Returns:
+        Tuple (times, freqs, duration): int32 arrays of peak frame indices
+        and frequency bins sorted by time, and the audio length in seconds
+    """
+    with wave.open(audio_path, 'rb') as wav:
+        n_samples = wav.getnframes()
+        duration = n_samples / wav.getframerate()
+        total_frames = max(0, 1 + (n_samples - FRAME_SIZE) // HOP_SIZE)
+
+        margin = PEAK_TIME_NEIGHBORHOOD // 2
+        all_times, all_freqs = [], []
+
+        for chunk_start in range(0, total_frames, CHUNK_FRAMES):
+            chunk_end = min(total_frames, chunk_start + CHUNK_FRAMES)
+            # Overlap neighbouring chunks so peaks at the seams see their neighbourhood
+            read_start = max(0, chunk_start - margin)
+            read_end = min(total_frames, chunk_end + margin)
+
+            samples = _read_wav_frames(
+                wav,
+                read_start * HOP_SIZE,
+                (read_end - read_start - 1) * HOP_SIZE + FRAME_SIZE
+            )
+            spec = _spectrogram_db(samples)
+            spec[:, 0] = spec.min()  # ignore DC
+
+            threshold = spec.mean() + PEAK_MIN_DB_ABOVE_MEAN
+            is_peak = (spec == _local_max(spec)) & (spec > threshold)
+
+            times, freqs = np.nonzero(is_peak)
+            times += read_start
+            keep = (times >= chunk_start) & (times < chunk_end)
+            all_times.append(times[keep])
+            all_freqs.append(freqs[keep])
+
+    if not all_times:
+        return np.zeros(0, np.int32), np.zeros(0, np.int32), duration
+
+    times = np.concatenate(all_times).astype(np.int32)
+    freqs = np.concatenate(all_freqs).astype(np.int32)
+    order = np.lexsort((freqs, times))
+    return times[order], freqs[order], duration
+
+
+def hash_peaks(times: np.ndarray, freqs: np.ndarray):
+    """
+    Combine each peak with its next FAN_OUT peaks into landmark hashes.
+
+    Hash layout: anchor bin (10 bits) | target bin (10 bits) | frame gap (6 bits).
+
+    Args:
+        times: Peak frame indices, sorted
+        freqs: Peak frequency bins
+
+    Returns:
+        Tuple (hashes, anchor_times) as int64 / int32 arrays
+    """
+    hashes, anchors = [], []
+    for k in range(1, FAN_OUT + 1):
+        if len(times) <= k:
+            break
+        dt = times[k:] - times[:-k]
+        valid = (dt > 0) & (dt <= MAX_PAIR_FRAMES)
+        f1 = freqs[:-k][valid].astype(np.int64)
+        f2 = freqs[k:][valid].astype(np.int64)
+        hashes.append((f1 << 16) | (f2 << 6) | dt[valid])
+        anchors.append(times[:-k][valid])
+
+    if not hashes:
+        return np.zeros(0, np.int64), np.zeros(0, np.int32)
+    return np.concatenate(hashes), np.concatenate(anchors).astype(np.int32)
+
+
+def compute_fingerprint(audio_path: str) -> dict:
+    """
+    Compute the landmark fingerprint of an extracted audio file.
+
+    Args:
+        audio_path: Path to 16 kHz mono WAV file
+
+    Returns:
+        Dict with 'hashes', 'times' (frame index of each hash) and 'duration'
+    """
+    times, freqs, duration = find_peaks(audio_path)
+    hashes, anchors = hash_peaks(times, freqs)
+    return {"hashes": hashes, "times": anchors, "duration": duration}
+
+
+def open_index(db_path: str) -> sqlite3.Connection:
+    """
+    Open (and create if needed) the fingerprint index.
+
+    Args:
+        db_path: Path to the SQLite database file
+
+    Returns:
+        Open sqlite3 connection
+
+    Raises:
+        sqlite3.Error: If the database is locked or cannot be read
+    """
+    os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+    conn = sqlite3.connect(db_path, timeout=INDEX_BUSY_TIMEOUT)
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS videos (
+            id INTEGER PRIMARY KEY,
+            video_name TEXT NOT NULL UNIQUE,
+            transcript_path TEXT NOT NULL,
+            duration REAL NOT NULL,
+            whisper_model TEXT
+        );
+        CREATE TABLE IF NOT EXISTS hashes (
+            hash INTEGER NOT NULL,
+            video_id INTEGER NOT NULL,
+            t INTEGER NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS hashes_by_hash ON hashes (hash);
+    """)
+    # Indexes from before the model was recorded; their rows never match
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(videos)")}
+    if 'whisper_model' not in columns:
+        conn.execute("ALTER TABLE videos ADD COLUMN whisper_model TEXT")
+    return conn
+
+
+def add_to_index(
+    conn: sqlite3.Connection,
+    video_name: str,
+    fingerprint: dict,
+    transcript_path: str,
+    whisper_model: str
+):
+    """
+    Store a video's fingerprint, replacing any earlier entry with the same name.
+
+    Args:
+        conn: Connection from open_index
+        video_name: Name of the video file (without extension)
+        fingerprint: Result of compute_fingerprint
+        transcript_path: Where the video's transcript JSON was saved
+        whisper_model: Whisper model the transcript was made with
+    """
+    with conn:
+        row = conn.execute("SELECT id FROM videos WHERE video_name = ?", (video_name,)).fetchone()
+        if row:
+            conn.execute("DELETE FROM hashes WHERE video_id = ?", (row[0],))
+            conn.execute("DELETE FROM videos WHERE id = ?", (row[0],))
+
+        cursor = conn.execute(
+            "INSERT INTO videos (video_name, transcript_path, duration, whisper_model) VALUES (?, ?, ?, ?)",
+            (video_name, transcript_path, fingerprint['duration'], whisper_model)
+        )
+        video_id = cursor.lastrowid
+        conn.executemany(
+            "INSERT INTO hashes (hash, video_id, t) VALUES (?, ?, ?)",
+            zip(fingerprint['hashes'].tolist(), [video_id] * len(fingerprint['hashes']),
+                fingerprint['times'].tolist())
+        )
+
+
+def _covered_regions(aligned_times: np.ndarray, query_times: np.ndarray, first: int, last: int) -> list:
+    """
+    Spans of the new timeline where the matched audio really lines up.
+
+    Args:
+        aligned_times: Anchor frames of the new audio's hashes that line up
+            at the winning offset
+        query_times: Anchor frames of all the new audio's hashes
+        first: First frame of the expected overlap
+        last: End frame (exclusive) of the expected overlap
+
+    Returns:
+        List of (start, end) frame ranges, sorted
+    """
+    window = int(round(MATCH_WINDOW_SECONDS / SECONDS_PER_FRAME))
+    n_windows = (last - 1) // window + 1 if last > 0 else 0
+    aligned_counts = np.bincount(aligned_times // window, minlength=n_windows)[:n_windows]
+    query_counts = np.bincount(query_times // window, minlength=n_windows)[:n_windows]
+
+    agrees = aligned_counts >= MIN_WINDOW_HASHES
+    silent = query_counts < MIN_WINDOW_HASHES
+    agrees[:first // window] = False
+
+    runs = []
+    run_start = run_end = None
+    for i in range(n_windows):
+        if agrees[i]:
+            if run_start is None:
+                run_start = i
+            run_end = i
+        elif not silent[i] and run_start is not None:
+            runs.append((run_start, run_end))
+            run_start = None
+    if run_start is not None:
+        runs.append((run_start, run_end))
+
+    # Trim each run to the aligned hashes themselves, not whole windows
+    regions = []
+    for start_window, end_window in runs:
+        inside = aligned_times[
+            (aligned_times >= start_window * window) & (aligned_times < (end_window + 1) * window)
+        ]
+        regions.append((max(int(inside.min()), first), min(int(inside.max()) + 1, last)))
+    return regions
+
+
+def find_match(conn: sqlite3.Connection, fingerprint: dict, whisper_model: str):
+    """
+    Look for an indexed video whose audio lines up with this fingerprint.
+
+    Votes are counted per (video, time offset); shared audio produces a sharp
+    spike at one offset, which absorbs ±1 frame of jitter. The winning offset
+    is then checked along the timeline, so a shared intro or jingle only
+    covers the seconds it actually lasts.
+
+    Args:
+        conn: Connection from open_index
+        fingerprint: Result of compute_fingerprint for the new audio
+        whisper_model: Only videos transcribed with this model are considered
+
+    Returns:
+        Dict with video_name, transcript_path, duration, offset (seconds to add
+        to a new-audio time to get the matched video's time), covered (list of
+        (start, end) seconds on the new timeline where the audio is shared),
+        matching_hashes and match_ratio (share of the hashes inside the
+        expected overlap that line up); or None if nothing matches well enough
+    """
+    n_hashes = len(fingerprint['hashes'])
+    if n_hashes == 0:
+        return None
+
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS query (hash INTEGER, t INTEGER)")
+    conn.execute("DELETE FROM query")
+    conn.executemany(
+        "INSERT INTO query (hash, t) VALUES (?, ?)",
+        zip(fingerprint['hashes'].tolist(), fingerprint['times'].tolist())
+    )
+
+    try:
+        rows = conn.execute("""
+            SELECT h.video_id, h.t - q.t AS offset, COUNT(*)
+            FROM query q
+            JOIN hashes h ON h.hash = q.hash
+            JOIN videos v ON v.id = h.video_id
+            WHERE v.whisper_model = ?
+            GROUP BY h.video_id, offset
+            HAVING COUNT(*) > 1
+        """, (whisper_model,)).fetchall()
+
+        if not rows:
+            return None
+
+        votes = np.array(rows, dtype=np.int64)
+        best_count, best_video, best_offset = 0, None, 0
+        for video_id in np.unique(votes[:, 0]):
+            video_votes = votes[votes[:, 0] == video_id]
+            offsets, counts = video_votes[:, 1], video_votes[:, 2]
+            # Sum each offset with its immediate neighbours to absorb frame jitter
+            span = np.arange(offsets.min() - 1, offsets.max() + 2)
+            histogram = np.zeros(len(span), dtype=np.int64)
+            histogram[offsets - span[0]] = counts
+            smoothed = histogram + np.roll(histogram, 1) + np.roll(histogram, -1)
+            peak = int(np.argmax(smoothed))
+            if smoothed[peak] > best_count:
+                best_count, best_video, best_offset = int(smoothed[peak]), int(video_id), int(span[peak])
+
+        if best_count < MIN_MATCHING_HASHES:
+            return None
+
+        aligned_times = np.array([t for (t,) in conn.execute("""
+            SELECT q.t
+            FROM query q JOIN hashes h ON h.hash = q.hash
+            WHERE h.video_id = ? AND h.t - q.t BETWEEN ? AND ?
+        """, (best_video, best_offset - 1, best_offset + 1))], dtype=np.int64)
+    finally:
+        conn.execute("DELETE FROM query")
+
+    video_name, transcript_path, duration = conn.execute(
+        "SELECT video_name, transcript_path, duration FROM videos WHERE id = ?", (best_video,)
+    ).fetchone()
+
+    # Frames of the new audio that can overlap the matched video at all
+    query_times = fingerprint['times'].astype(np.int64)
+    first = max(0, -best_offset)
+    last = min(
+        int(fingerprint['duration'] / SECONDS_PER_FRAME) + 1,
+        int(duration / SECONDS_PER_FRAME) + 1 - best_offset
+    )
+    in_overlap = np.count_nonzero((query_times >= first) & (query_times < last))
+    ratio = len(aligned_times) / in_overlap if in_overlap else 0.0
+    if ratio < MIN_MATCH_RATIO:
+        return None
+
+    covered = [
+        (start * SECONDS_PER_FRAME, min(end * SECONDS_PER_FRAME, fingerprint['duration']))
+        for start, end in _covered_regions(aligned_times, query_times, first, last)
+    ]
+    if not covered:
+        return None
+
+    return {
+        "video_name": video_name,
+        "transcript_path": transcript_path,
+        "duration": duration,
+        "offset": best_offset * SECONDS_PER_FRAME,
+        "covered": covered,
+        "matching_hashes": best_count,
+        "match_ratio": round(float(ratio), 3),
+    }
+
+
+def plan_reuse(match: dict, duration: float):
+    """
+    Work out which parts of the new audio the matched transcript covers.
+
+    Args:
+        match: Result of find_match
+        duration: Length of the new audio in seconds
+
+    Returns:
+        Tuple (covered, new_regions): covered lists (start, end) ranges on the
+        new timeline; new_regions lists (start, end) ranges still to transcribe
+    """
+    covered = match['covered']
+    new_regions = []
+    position = 0.0
+    for start, end in covered + [(duration, duration)]:
+        if start - position >= MIN_NEW_REGION:
+            new_regions.append((position, start))
+        position = max(position, end)
+
+    return covered, new_regions
+
+
+def reuse_transcript(
+    match: dict,
+    previous: dict,
+    audio_path: str,
+    duration: float,
+    model_name: str,
+    speech_regions: list = None,
+    word_timestamps: bool = False,
+    memory_budget_mb: float = None,
+    segments_path: str = None,
+    max_window_seconds: float = 300
+) -> dict:
+    """
+    Build a transcript for new audio from a matched earlier transcript.
+
+    Segments inside the shared spans are shifted onto the new timeline;
+    everything else is transcribed with Whisper, in memory-mapped windows
+    (see transcribe_low_memory) when a memory budget is given.
+
+    Args:
+        match: Result of find_match
+        previous: The matched video's transcript dict
+        audio_path: Path to the new audio file
+        duration: Length of the new audio in seconds
+        model_name: Whisper model for any new regions
+        speech_regions: Optional speech ranges; new regions are limited to these
+        word_timestamps: Request per-word timings for newly transcribed regions
+        memory_budget_mb: Transcribe new regions with transcribe_low_memory
+            under this budget instead of loading each region whole
+        segments_path: JSON Lines file for transcribe_low_memory's segments
+        max_window_seconds: Longest window transcribe_low_memory runs at once
+
+    Returns:
+        Transcript dict on the new audio's timeline
+    """
+    covered, new_regions = plan_reuse(match, duration)
+
+    # Keep earlier segments centred in a shared span, clipped to it
+    segments = []
+    for seg in shift_segments(previous.get('segments', []), -match['offset']):
+        middle = (seg['start'] + seg['end']) / 2
+        for start, end in covered:
+            if start <= middle < end:
+                seg['start'] = max(seg['start'], start)
+                seg['end'] = min(seg['end'], end)
+                if 'words' in seg:
+                    seg['words'] = [
+                        word for word in seg['words']
+                        if start <= (word['start'] + word['end']) / 2 < end
+                    ]
+                segments.append(seg)
+                break
+
+    if speech_regions is not None:
+        new_regions = intersect_regions(new_regions, speech_regions)
+
+    if new_regions and memory_budget_mb is not None:
+        fresh = transcribe_low_memory(
+            audio_path, model_name, memory_budget_mb, segments_path,
+            speech_regions=new_regions,
+            word_timestamps=word_timestamps,
+            max_window_seconds=max_window_seconds
+        )
+        segments.extend(fresh['segments'])
+    elif new_regions:
+        fresh = transcribe_regions(audio_path, new_regions, model_name, word_timestamps)
+        segments.extend(fresh['segments'])
+
+    return merge_segments(segments, previous.get('language'))
@@ -0,0 +1,198 @@
+"""
+Caption module for burning word-timed subtitles into clips.
+
+Builds styled ASS subtitle files from the Whisper transcript, with karaoke
+word highlighting and timestamps relative to each clip's start, so the clip
+renderer can burn them in inside its existing filter chain.
+"""
+
+import bisect
+
+from config import CAPTION_FONT, CAPTION_WORDS_PER_LINE, CAPTION_MAX_GAP
+
+# ASS colours are &HAABBGGRR
+HIGHLIGHT_COLOUR = '&H0000FFFF'  # yellow, filled in as each word is spoken
+TEXT_COLOUR = '&H00FFFFFF'  # white
+OUTLINE_COLOUR = '&H00000000'
+SHADOW_COLOUR = '&H80000000'
+
+
+class SegmentIndex:
+    """
+    Transcript segments indexed by time for fast range lookups.
+
+    Segments are sorted by start; a running maximum of end times lets
+    `segments_between` binary-search both ends of a range instead of scanning
+    the whole transcript for every clip.
+    """
+
+    def __init__(self, transcript: dict):
+        self.segments = sorted(transcript.get('segments', []), key=lambda seg: seg['start'])
+        self.starts = [seg['start'] for seg in self.segments]
+        self.max_ends = []
+        running = float('-inf')
+        for seg in self.segments:
+            running = max(running, seg['end'])
+            self.max_ends.append(running)
+
+    def segments_between(self, start: float, end: float) -> list:
+        """
+        Return segments overlapping [start, end).
+
+        Args:
+            start: Range start in seconds
+            end: Range end in seconds
+
+        Returns:
+            Overlapping segments in time order
+        """
+        first = bisect.bisect_right(self.max_ends, start)
+        last = bisect.bisect_left(self.starts, end)
+        return [seg for seg in self.segments[first:last] if seg['end'] > start]
+
+
+def _segment_words(seg: dict) -> list:
+    """Word timings of a segment, spread evenly if Whisper gave none."""
+    if seg.get('words'):
+        return [(w['word'].strip(), w['start'], w['end']) for w in seg['words'] if w['word'].strip()]
+
+    tokens = seg['text'].split()
+    if not tokens:
+        return []
+    step = (seg['end'] - seg['start']) / len(tokens)
+    return [
+        (token, seg['start'] + i * step, seg['start'] + (i + 1) * step)
+        for i, token in enumerate(tokens)
+    ]
+
+
+def words_for_clip(index: SegmentIndex, start_time: float, end_time: float) -> list:
+    """
+    Collect the words spoken during a clip, with clip-relative timestamps.
+
+    Args:
+        index: SegmentIndex of the transcript
+        start_time: Clip start in seconds (source timeline)
+        end_time: Clip end in seconds (source timeline)
+
+    Returns:
+        List of (text, start, end) tuples, times relative to start_time
+    """
+    words = []
+    for seg in index.segments_between(start_time, end_time):
+        for text, word_start, word_end in _segment_words(seg):
+            if word_end <= start_time or word_start >= end_time:
+                continue
+            words.append((
+                text,
+                max(word_start, start_time) - start_time,
+                min(word_end, end_time) - start_time
+            ))
+    return words
+
+
+def _group_lines(words: list) -> list:
+    """Split words into caption lines by word count and pauses."""
+    lines = []
+    for word in words:
+        if (
+            lines
+            and len(lines[-1]) < CAPTION_WORDS_PER_LINE
+            and word[1] - lines[-1][-1][2] <= CAPTION_MAX_GAP
+        ):
+            lines[-1].append(word)
+        else:
+            lines.append([word])
+    return lines
+
+
+def _ass_time(seconds: float) -> str:
+    centiseconds = int(round(max(seconds, 0.0) * 100))
+    hours, centiseconds = divmod(centiseconds, 360000)
+    minutes, centiseconds = divmod(centiseconds, 6000)
+    secs, centiseconds = divmod(centiseconds, 100)
+    return f"{hours}:{minutes:02d}:{secs:02d}.{centiseconds:02d}"
+
+
+def _ass_text(text: str) -> str:
+    return text.replace('\\', '/').replace('{', '(').replace('}', ')')
+
+
+def _ass_header(width: int, height: int, font_size: int, margin_v: int) -> list:
+    """Script info, the bottom-centred Caption style and the events header."""
+    return [
+        "[Script Info]",
+        "ScriptType: v4.00+",
+        f"PlayResX: {width}",
+        f"PlayResY: {height}",
+        "WrapStyle: 0",
+        "",
+        "[V4+ Styles]",
+        "Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, "
+        "BackColour, Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, "
+        "BorderStyle, Outline, Shadow, Alignment, MarginL, MarginR, MarginV, Encoding",
+        f"Style: Caption,{CAPTION_FONT},{font_size},{HIGHLIGHT_COLOUR},{TEXT_COLOUR},"
+        f"{OUTLINE_COLOUR},{SHADOW_COLOUR},-1,0,0,0,100,100,0,0,1,{max(2, font_size // 16)},2,"
+        f"2,60,60,{margin_v},1",
+        "",
+        "[Events]",
+        "Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text",
+    ]
+
+
+def write_ass(words: list, output_path: str, width: int, height: int) -> str:
+    """
+    Write an ASS subtitle file with karaoke-highlighted caption lines.
+
+    Args:
+        words: (text, start, end) tuples from words_for_clip
+        output_path: Where to save the .ass file
+        width: Video width the captions are rendered for
+        height: Video height the captions are rendered for
+
+    Returns:
+        Path to the written file
+    """
+    lines = _ass_header(width, height, int(min(width, height) * 0.075), int(height * 0.12))
+
+    for line in _group_lines(words):
+        start = line[0][1]
+        end = line[-1][2]
+        parts = []
+        for i, (text, word_start, word_end) in enumerate(line):
+            next_start = line[i + 1][1] if i + 1 < len(line) else word_end
+            duration_cs = max(1, int(round((next_start - word_start) * 100)))
+            parts.append(f"{{\\kf{duration_cs}}}{_ass_text(text)}")
+        lines.append(
+            f"Dialogue: 0,{_ass_time(start)},{_ass_time(end)},Caption,,0,0,0,,{' '.join(parts)}"
+        )
+
+    with open(output_path, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(lines) + '\n')
+
+    return output_path
+
+
+def write_title_ass(text: str, output_path: str, width: int, height: int) -> str:
+    """
+    Write an ASS file that shows one large title over a still frame.
+
+    Used for thumbnail text; the text is drawn in the caption style, filled
+    with the highlight colour.
+
+    Args:
+        text: Title text (e.g. a clip's thumbnail_text)
+        output_path: Where to save the .ass file
+        width: Image width
+        height: Image height
+
+    Returns:
+        Path to the written file
+    """
+    lines = _ass_header(width, height, int(min(width, height) * 0.14), int(height * 0.1))
+    lines.append(f"Dialogue: 0,0:00:00.00,0:00:10.00,Caption,,0,0,0,,{{\\1c&H{HIGHLIGHT_COLOUR[4:]}&}}{_ass_text(text)}")
+
+    with open(output_path, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(lines) + '\n')
+
+    return output_path
@@ -4,6 +4,53 @@ Clip generation module for cutting video clips using FFmpeg.
 
 import subprocess
 import os
+import time
+from src.captions import SegmentIndex, words_for_clip, write_ass
+from src.video_processor import escape_filter_path, run_ffmpeg
+from src.loudness import measure_range, build_loudnorm_filter
+
+# Output formats a clip can be rendered in (name -> frame size and file suffix)
+OUTPUT_PROFILES = {
+    'horizontal': {'width': 1920, 'height': 1080, 'suffix': '16x9', 'label': '16:9'},
+    'vertical': {'width': 1080, 'height': 1920, 'suffix': '9x16', 'label': 'vertical 9:16'},
+    'square': {'width': 1080, 'height': 1080, 'suffix': '1x1', 'label': 'square 1:1'},
+}
+
+VIDEO_ENCODE_ARGS = ['-c:v', 'libx264', '-preset', 'fast', '-crf', '23']
+AUDIO_ENCODE_ARGS = [
+    '-c:a', 'aac',
+    '-b:a', '128k',
+    '-ar', '48000',  # 48kHz sample rate (standard for video)
+    '-ac', '2',  # Stereo audio
+]
+
+
+def build_profile_filter(source: str, profile: dict, output: str, subtitles_path: str = None) -> str:
+    """
+    Build the filter chain that fits a video stream into a profile's frame.
+
+    The video is scaled to fit inside the frame and centered over a blurred,
+    frame-filling copy of itself (Instagram/TikTok style blur bars).
+
+    Args:
+        source: Input pad label, e.g. "[0:v]"
+        profile: Entry from OUTPUT_PROFILES
+        output: Name for the output pad (without brackets)
+        subtitles_path: Optional ASS file to burn in at the end of the chain
+
+    Returns:
+        filter_complex fragment ending in [output]
+    """
+    w, h = profile['width'], profile['height']
+    burn_in = f",ass=filename={escape_filter_path(subtitles_path)}" if subtitles_path else ""
+    return (
+        f"{source}split=2[{output}_fg][{output}_bg];"
+        f"[{output}_bg]scale={w}:{h}:force_original_aspect_ratio=increase,crop={w}:{h},"
+        "boxblur=luma_radius=min(h\\,w)/20:luma_power=1:chroma_radius=min(cw\\,ch)/20:chroma_power=1"
+        f"[{output}_blur];"
+        f"[{output}_fg]scale={w}:{h}:force_original_aspect_ratio=decrease[{output}_main];"
+        f"[{output}_blur][{output}_main]overlay=(W-w)/2:(H-h)/2,setsar=1{burn_in}[{output}]"
+    )
 
 
 def cut_clip(
@@ -12,7 +59,9 @@ def cut_clip(
     end_time: float,
     output_path: str,
     clip_index: int,
-    vertical: bool = False
+    vertical: bool = False,
+    subtitles_path: str = None,
+    audio_filter: str = None
 ) -> bool:
     """
     Cut a single clip from video using FFmpeg.
@@ -24,6 +73,8 @@ def cut_clip(
         output_path: Where to save the clip
         clip_index: Clip number (for progress display)
         vertical: If True, convert to 9:16 vertical format with blur bars
+        subtitles_path: Optional ASS file (clip-relative times) to burn in
+        audio_filter: Optional audio filter (e.g. loudnorm) applied while encoding
 
     Returns:
         True if successful, False otherwise
@@ -38,72 +89,178 @@ def cut_clip(
             '-ss', str(start_time),
             '-i', video_path,
             '-t', str(duration),
-            '-filter_complex',
-            '[0:v]scale=1080:1920:force_original_aspect_ratio=decrease,pad=1080:1920:(ow-iw)/2:(oh-ih)/2:black[main];'
-            '[0:v]scale=1080:1920:force_original_aspect_ratio=increase,boxblur=luma_radius=min(h\\,w)/20:luma_power=1:chroma_radius=min(cw\\,ch)/20:chroma_power=1[bg];'
-            '[bg][main]overlay=(W-w)/2:(H-h)/2',
-            '-c:v', 'libx264',
-            '-preset', 'fast',
-            '-crf', '23',
-            '-c:a', 'aac',
-            '-b:a', '128k',
-            '-ar', '48000',  # 48kHz sample rate (standard for video)
-            '-ac', '2',  # Stereo audio
+            '-filter_complex', build_profile_filter(
+                '[0:v]', OUTPUT_PROFILES['vertical'], 'v', subtitles_path
+            ),
+            '-map', '[v]',
+            '-map', '0:a?',
+            *VIDEO_ENCODE_ARGS,
+            *(['-af', audio_filter] if audio_filter else []),
+            *AUDIO_ENCODE_ARGS,
             '-movflags', '+faststart',  # Enable streaming/web playback
             '-y',
             output_path
         ]
         try:
-            subprocess.run(cmd, capture_output=True, check=True, text=True)
+            run_ffmpeg(cmd, 'cut_clip', duration, f"Clip {clip_index}")
             print(f"  ✓ Clip {clip_index} saved (vertical 9:16)")
             return True
         except subprocess.CalledProcessError as e:
             print(f"  ✗ Failed to create vertical clip {clip_index}: {e.stderr}")
             return False
     else:
-        # Original horizontal clip (fast codec copy)
-        cmd = [
-            'ffmpeg',
-            '-ss', str(start_time),
-            '-i', video_path,
-            '-t', str(duration),
-            '-c', 'copy',  # Fast codec copy
-            '-avoid_negative_ts', 'make_zero',  # Fix timestamp issues
-            '-y',
-            output_path
-        ]
-
-        try:
-            subprocess.run(cmd, capture_output=True, check=True, text=True)
-            print(f"  ✓ Clip {clip_index} saved")
-            return True
-        except subprocess.CalledProcessError:
-            # Codec copy failed, try re-encoding
-            print(f"  ⚠ Codec copy failed for clip {clip_index}, re-encoding...")
+        if subtitles_path is None:
+            # Original horizontal clip (fast codec copy)
             cmd = [
                 'ffmpeg',
                 '-ss', str(start_time),
                 '-i', video_path,
                 '-t', str(duration),
-                '-c:v', 'libx264',
-                '-c:a', 'aac',
-                '-b:a', '128k',
-                '-ar', '48000',  # 48kHz sample rate
-                '-ac', '2',  # Stereo audio
-                '-movflags', '+faststart',  # Enable web playback
+            ]
+            if audio_filter:
+                # Video is still copied; only the audio is re-encoded
+                cmd += ['-c:v', 'copy', '-af', audio_filter, *AUDIO_ENCODE_ARGS]
+            else:
+                cmd += ['-c', 'copy']  # Fast codec copy
+            cmd += [
+                '-avoid_negative_ts', 'make_zero',  # Fix timestamp issues
                 '-y',
                 output_path
             ]
+
             try:
-                subprocess.run(cmd, capture_output=True, check=True, text=True)
-                print(f"  ✓ Clip {clip_index} saved (re-encoded)")
+                run_ffmpeg(cmd, 'cut_clip', duration, f"Clip {clip_index}")
+                print(f"  ✓ Clip {clip_index} saved")
                 return True
-            except subprocess.CalledProcessError as e:
-                print(f"  ✗ Failed to cut clip {clip_index}: {e.stderr}")
-                return False
+            except subprocess.CalledProcessError:
+                # Codec copy failed, try re-encoding
+                print(f"  ⚠ Codec copy failed for clip {clip_index}, re-encoding...")
+
+        # Re-encode (codec copy failed, or captions have to be burned in)
+        cmd = [
+            'ffmpeg',
+            '-ss', str(start_time),
+            '-i', video_path,
+            '-t', str(duration),
+        ]
+        if subtitles_path:
+            cmd += ['-vf', f"ass=filename={escape_filter_path(subtitles_path)}"]
+        if audio_filter:
+            cmd += ['-af', audio_filter]
+        cmd += [
+            *VIDEO_ENCODE_ARGS,
+            *AUDIO_ENCODE_ARGS,
+            '-movflags', '+faststart',  # Enable web playback
+            '-y',
+            output_path
+        ]
+        try:
+            run_ffmpeg(cmd, 'cut_clip', duration, f"Clip {clip_index}")
+            print(f"  ✓ Clip {clip_index} saved (re-encoded)")
+            return True
+        except subprocess.CalledProcessError as e:
+            print(f"  ✗ Failed to cut clip {clip_index}: {e.stderr}")
+            return False
 
 
-def generate_all_clips(video_path: str, clips: list, output_dir: str, vertical: bool = False) -> list:
+def cut_clip_profiles(
+    video_path: str,
+    start_time: float,
+    end_time: float,
+    output_paths: dict,
+    clip_index: int,
+    subtitles_paths: dict = None,
+    audio_filter: str = None
+) -> list:
+    """
+    Render one clip range in several output profiles with a single FFmpeg run.
+
+    The range is decoded once and the frames are split into one
+    scale/pad/blur chain and encoder per profile.
+
+    Args:
+        video_path: Path to source video
+        start_time: Start time in seconds
+        end_time: End time in seconds
+        output_paths: Profile name -> output file path
+        clip_index: Clip number (for progress display)
+        subtitles_paths: Optional profile name -> ASS file to burn in
+        audio_filter: Optional audio filter (e.g. loudnorm) for every output
+
+    Returns:
+        List of written file paths (empty if FFmpeg failed)
+    """
+    duration = end_time - start_time
+    names = list(output_paths)
+
+    split_pads = ''.join(f"[in{i}]" for i in range(len(names)))
+    filters = [f"[0:v]split={len(names)}{split_pads}"]
+    for i, name in enumerate(names):
+        filters.append(build_profile_filter(
+            f"[in{i}]",
+            OUTPUT_PROFILES[name],
+            f"out{i}",
+            (subtitles_paths or {}).get(name)
+        ))
+
+    # -t goes before -i so it limits the input and applies to every output
+    cmd = [
+        'ffmpeg',
+        '-ss', str(start_time),
+        '-t', str(duration),
+        '-i', video_path,
+        '-filter_complex', ';'.join(filters),
+    ]
+    for i, name in enumerate(names):
+        cmd += [
+            '-map', f"[out{i}]",
+            '-map', '0:a?',
+            *VIDEO_ENCODE_ARGS,
+            *(['-af', audio_filter] if audio_filter else []),
+            *AUDIO_ENCODE_ARGS,
+            '-movflags', '+faststart',
+            '-y',
+            output_paths[name]
+        ]
+
+    try:
+        run_ffmpeg(cmd, 'cut_clip', duration, f"Clip {clip_index}")
+    except subprocess.CalledProcessError as e:
+        print(f"  ✗ Failed to render clip {clip_index}: {e.stderr}")
+        return []
+
+    labels = ", ".join(OUTPUT_PROFILES[name]['label'] for name in names)
+    print(f"  ✓ Clip {clip_index} saved ({labels})")
+    return [output_paths[name] for name in names]
+
+
+def clip_audio_filter(loudness: dict, clip: dict):
+    """
+    Build the loudnorm filter for a clip from source loudness stats.
+
+    Args:
+        loudness: Result of loudness.load_loudness, or None
+        clip: Clip dict with start_time and end_time
+
+    Returns:
+        Audio filter string, or None if there are no stats or the range is silent
+    """
+    if loudness is None:
+        return None
+    measurement = measure_range(loudness, clip['start_time'], clip['end_time'])
+    return build_loudnorm_filter(measurement) if measurement else None
+
+
+def generate_all_clips(
+    video_path: str,
+    clips: list,
+    output_dir: str,
+    vertical: bool = False,
+    profiles: list = None,
+    transcript: dict = None,
+    loudness: dict = None,
+    name: str = None
+) -> list:
     """
     Generate all video clips.
 
@@ -112,12 +269,66 @@ def generate_all_clips(video_path: str, clips: list, output_dir: str, vertical:
         clips: List of clip dictionaries with start_time and end_time
         output_dir: Directory where to save clips
         vertical: If True, convert clips to 9:16 vertical format
+        profiles: Optional list of OUTPUT_PROFILES names; each clip is then
+            rendered once per profile in a single FFmpeg run, saved as
+            <video>_clip_NN_<suffix>.mp4 (overrides `vertical`)
+        transcript: If given, burn word-timed captions from this Whisper
+            transcript into each clip (the .ass files are kept next to them)
+        loudness: If given (see loudness.load_loudness), normalize each clip's
+            audio with single-pass loudnorm using stats for its range
+        name: Base name for the output files (default: the video's file name)
 
     Returns:
         List of successfully generated clip file paths
     """
-    video_name = os.path.splitext(os.path.basename(video_path))[0]
+    video_name = name or os.path.splitext(os.path.basename(video_path))[0]
     generated_paths = []
+    segment_index = SegmentIndex(transcript) if transcript else None
+
+    if profiles:
+        labels = ", ".join(OUTPUT_PROFILES[name]['label'] for name in profiles)
+        print(f"\n⏳ Rendering {len(clips)} clips with FFmpeg ({labels})...")
+
+        started = time.monotonic()
+        decoded_seconds = 0.0
+        for i, clip in enumerate(clips, 1):
+            output_paths = {
+                name: os.path.join(
+                    output_dir,
+                    f"{video_name}_clip_{i:02d}_{OUTPUT_PROFILES[name]['suffix']}.mp4"
+                )
+                for name in profiles
+            }
+            audio_filter = clip_audio_filter(loudness, clip)
+            subtitles_paths = None
+            if segment_index:
+                words = words_for_clip(segment_index, clip['start_time'], clip['end_time'])
+                subtitles_paths = {
+                    name: write_ass(
+                        words,
+                        os.path.splitext(path)[0] + '.ass',
+                        OUTPUT_PROFILES[name]['width'],
+                        OUTPUT_PROFILES[name]['height']
+                    )
+                    for name, path in output_paths.items()
+                }
+            generated_paths.extend(cut_clip_profiles(
+                video_path,
+                clip['start_time'],
+                clip['end_time'],
+                output_paths,
+                i,
+                subtitles_paths,
+                audio_filter
+            ))
+            decoded_seconds += clip['end_time'] - clip['start_time']
+
+        elapsed = time.monotonic() - started
+        saved_seconds = decoded_seconds * (len(profiles) - 1)
+        print(f"  Rendered in {elapsed:.1f}s; decoded {decoded_seconds:.0f}s of source once "
+              f"instead of {decoded_seconds * len(profiles):.0f}s across separate runs "
+              f"({saved_seconds:.0f}s of decoding saved)")
+        return generated_paths
 
     format_msg = "vertical 9:16" if vertical else "original format"
     print(f"\n⏳ Cutting {len(clips)} clips with FFmpeg ({format_msg})...")
@@ -126,13 +337,25 @@ def generate_all_clips(video_path: str, clips: list, output_dir: str, vertical:
         output_filename = f"{video_name}_clip_{i:02d}.mp4"
         output_path = os.path.join(output_dir, output_filename)
 
+        subtitles_path = None
+        if segment_index:
+            profile = OUTPUT_PROFILES['vertical' if vertical else 'horizontal']
+            subtitles_path = write_ass(
+                words_for_clip(segment_index, clip['start_time'], clip['end_time']),
+                os.path.splitext(output_path)[0] + '.ass',
+                profile['width'],
+                profile['height']
+            )
+
         success = cut_clip(
             video_path,
             clip['start_time'],
             clip['end_time'],
             output_path,
             i,
-            vertical=vertical
+            vertical=vertical,
+            subtitles_path=subtitles_path,
+            audio_filter=clip_audio_filter(loudness, clip)
         )
 
         if success:
@@ -2,43 +2,25 @@
 Highlight analysis module using Claude API to identify best clip moments.
 """
 
-import anthropic
 import json
 import re
-from config import get_api_key
+from src.llm_gateway import create_message
+from src.transcript_prefix import format_segments, build_cached_messages
 
 
-def build_analysis_prompt(transcript: dict, max_clips: int, min_duration: int, max_duration: int) -> str:
+def build_analysis_instructions(max_clips: int, min_duration: int, max_duration: int) -> str:
     """
-    Build the prompt for Claude API.
+    Build the clip criteria and output format part of the analysis prompt.
 
     Args:
-        transcript: Whisper transcript dictionary
         max_clips: Maximum number of clips to suggest
         min_duration: Minimum clip duration in seconds
         max_duration: Maximum clip duration in seconds
 
     Returns:
-        Formatted prompt string for Claude
+        Instructions text (everything after the transcript)
     """
-    full_text = transcript.get('text', '')
-    segments = transcript.get('segments', [])
-
-    # Format segments with timestamps
-    formatted_segments = []
-    for seg in segments:
-        formatted_segments.append(
-            f"[{seg['start']:.1f}s - {seg['end']:.1f}s] {seg['text']}"
-        )
-
-    segments_text = "\n".join(formatted_segments)
-
-    prompt = f"""You are an expert YouTube Shorts creator and copywriter. Analyze this video transcript and identify the {max_clips} BEST moments to turn into viral YouTube Shorts (15-60 second clips).
-
-TRANSCRIPT:
-{segments_text}
-
-CRITERIA FOR GREAT SHORTS:
+    return f"""CRITERIA FOR GREAT SHORTS:
 - Self-contained stories or moments (make sense without context)
 - High energy, emotional peaks, or funny moments
 - Clear punchlines, revelations, or key insights
@@ -72,6 +54,30 @@ Return your response as a JSON array ONLY (no other text):
   }}
 ]"""
 
+
+def build_analysis_prompt(transcript: dict, max_clips: int, min_duration: int, max_duration: int) -> str:
+    """
+    Build the prompt for Claude API.
+
+    Args:
+        transcript: Whisper transcript dictionary
+        max_clips: Maximum number of clips to suggest
+        min_duration: Minimum clip duration in seconds
+        max_duration: Maximum clip duration in seconds
+
+    Returns:
+        Formatted prompt string for Claude
+    """
+    segments_text = format_segments(transcript)
+    instructions = build_analysis_instructions(max_clips, min_duration, max_duration)
+
+    prompt = f"""You are an expert YouTube Shorts creator and copywriter. Analyze this video transcript and identify the {max_clips} BEST moments to turn into viral YouTube Shorts (15-60 second clips).
+
+TRANSCRIPT:
+{segments_text}
+
+{instructions}"""
+
     return prompt
 
 
@@ -79,7 +85,9 @@ def analyze_highlights(
     transcript: dict,
     max_clips: int = 5,
     min_duration: int = 15,
-    max_duration: int = 60
+    max_duration: int = 60,
+    video_name: str = "",
+    use_prompt_cache: bool = False
 ) -> list:
     """
     Use Claude API to analyze transcript and find highlights.
@@ -89,6 +97,9 @@ def analyze_highlights(
         max_clips: Maximum number of clips to suggest
         min_duration: Minimum clip length in seconds
         max_duration: Maximum clip length in seconds
+        video_name: Name of the video file (part of the shared cached prefix)
+        use_prompt_cache: Send the transcript as the shared cached prefix so it
+            is reused from the metadata request instead of billed again
 
     Returns:
         List of clip dicts with start_time, end_time, title, hook, description,
@@ -97,17 +108,24 @@ def analyze_highlights(
     Raises:
         Exception: If Claude API call fails
     """
-    client = anthropic.Anthropic(api_key=get_api_key())
-
-    prompt = build_analysis_prompt(transcript, max_clips, min_duration, max_duration)
+    if use_prompt_cache:
+        instructions = (
+            "You are an expert YouTube Shorts creator and copywriter. Analyze the video "
+            f"transcript above and identify the {max_clips} BEST moments to turn into "
+            "viral YouTube Shorts (15-60 second clips).\n\n"
+            + build_analysis_instructions(max_clips, min_duration, max_duration)
+        )
+        messages = build_cached_messages(transcript, video_name, instructions)
+    else:
+        prompt = build_analysis_prompt(transcript, max_clips, min_duration, max_duration)
+        messages = [{"role": "user", "content": prompt}]
 
     print("Analyzing highlights with Claude AI...")
-    message = client.messages.create(
+    message = create_message(
+        label="highlights",
         model="claude-sonnet-4-5-20250929",
         max_tokens=2048,
-        messages=[
-            {"role": "user", "content": prompt}
-        ]
+        messages=messages
     )
 
     # Parse Claude's response
@@ -0,0 +1,440 @@
+"""
+Job queue module for distributing videos across worker nodes.
+
+Jobs live in a shared directory (NFS or similar) that every worker can see:
+
+    jobs/
+    ├── pending/   <job_id>.json   - queued jobs (stay here while leased)
+    ├── leases/    <job_id>.lease  - who owns a job and until when
+    ├── done/      <job_id>.json   - finished jobs
+    └── failed/    <job_id>.json   - jobs whose pipeline raised an error
+
+A lease is claimed by hard-linking a private temp file onto the lease path,
+which is atomic on local filesystems and NFS alike. Workers heartbeat the
+lease while they work; expired leases are reclaimed by whichever worker
+notices first, making the job claimable again.
+"""
+
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+
+
+JOB_SUBDIRS = ('pending', 'leases', 'done', 'failed')
+
+
+def default_worker_id() -> str:
+    """
+    Build a worker id that is unique across hosts sharing the job directory.
+
+    Returns:
+        str: "<hostname>-<pid>"
+    """
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def init_job_dir(job_dir: str):
+    """
+    Create the job directory layout if it doesn't exist.
+
+    Args:
+        job_dir: Root of the shared job directory
+    """
+    for name in JOB_SUBDIRS:
+        os.makedirs(os.path.join(job_dir, name), exist_ok=True)
+
+
+def _write_json_atomic(path: str, data: dict):
+    """Write JSON via a temp file + rename so readers never see partial files."""
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def _read_json(path: str):
+    """Read a JSON file, returning None if it vanished or is mid-write."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def _lease_path(job_dir: str, job_id: str) -> str:
+    return os.path.join(job_dir, 'leases', f"{job_id}.lease")
+
+
+def submit_job(job_dir: str, video_path: str, options: dict = None) -> str:
+    """
+    Queue a video for processing by any worker.
+
+    Args:
+        job_dir: Root of the shared job directory
+        video_path: Path to the video (must be reachable from every worker)
+        options: Pipeline options (max_clips, vertical, ...) applied by the worker
+
+    Returns:
+        The new job id
+    """
+    init_job_dir(job_dir)
+    video_name = os.path.splitext(os.path.basename(video_path))[0]
+    job_id = f"{int(time.time() * 1000)}_{uuid.uuid4().hex[:8]}_{video_name}"
+
+    job = {
+        "job_id": job_id,
+        "video_path": os.path.abspath(video_path),
+        "options": options or {},
+        "submitted_at": time.time(),
+    }
+    _write_json_atomic(os.path.join(job_dir, 'pending', f"{job_id}.json"), job)
+    return job_id
+
+
+def list_pending_jobs(job_dir: str) -> list:
+    """
+    List queued job ids, oldest first.
+
+    Args:
+        job_dir: Root of the shared job directory
+
+    Returns:
+        List of job ids still in pending/ (leased or not)
+    """
+    pending_dir = os.path.join(job_dir, 'pending')
+    if not os.path.isdir(pending_dir):
+        return []
+    return sorted(
+        name[:-len('.json')] for name in os.listdir(pending_dir)
+        if name.endswith('.json')
+    )
+
+
+def count_jobs(job_dir: str) -> dict:
+    """
+    Count jobs by state, for queue depth metrics.
+
+    Args:
+        job_dir: Root of the shared job directory
+
+    Returns:
+        Dict with queued (pending, not leased), running (leased), done and failed
+    """
+    counts = {}
+    for subdir, suffix in (('pending', '.json'), ('leases', '.lease'), ('done', '.json'), ('failed', '.json')):
+        path = os.path.join(job_dir, subdir)
+        counts[subdir] = sum(1 for name in os.listdir(path) if name.endswith(suffix)) if os.path.isdir(path) else 0
+    return {
+        'queued': max(counts['pending'] - counts['leases'], 0),
+        'running': counts['leases'],
+        'done': counts['done'],
+        'failed': counts['failed'],
+    }
+
+
+def read_lease(job_dir: str, job_id: str):
+    """
+    Read the current lease for a job.
+
+    Returns:
+        Lease dict with worker_id and expires_at, or None if unleased
+    """
+    return _read_json(_lease_path(job_dir, job_id))
+
+
+def claim_job(job_dir: str, job_id: str, worker_id: str, lease_ttl: float) -> bool:
+    """
+    Try to take the lease on a job.
+
+    Args:
+        job_dir: Root of the shared job directory
+        job_id: Job to claim
+        worker_id: Id of the claiming worker
+        lease_ttl: Seconds until the lease expires without a heartbeat
+
+    Returns:
+        True if this worker now owns the job, False if someone else does
+    """
+    lease_path = _lease_path(job_dir, job_id)
+    tmp_path = f"{lease_path}.{worker_id}.{uuid.uuid4().hex}.tmp"
+    lease = {
+        "job_id": job_id,
+        "worker_id": worker_id,
+        "claimed_at": time.time(),
+        "expires_at": time.time() + lease_ttl,
+    }
+
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(lease, f)
+        f.flush()
+        os.fsync(f.fileno())
+
+    try:
+        # link() fails with EEXIST if another worker holds the lease
+        os.link(tmp_path, lease_path)
+        claimed = True
+    except FileExistsError:
+        claimed = False
+    finally:
+        os.remove(tmp_path)
+
+    # A job may have been completed between listing and claiming
+    if claimed and not os.path.exists(os.path.join(job_dir, 'pending', f"{job_id}.json")):
+        release_lease(job_dir, job_id, worker_id)
+        return False
+
+    return claimed
+
+
+def renew_lease(job_dir: str, job_id: str, worker_id: str, lease_ttl: float) -> bool:
+    """
+    Extend a lease held by this worker (heartbeat).
+
+    The lease file is rewritten in place through one open handle rather than
+    replaced by path. Every claim links a fresh file, so the handle can only
+    ever point at this worker's own lease: if it was reclaimed and re-claimed
+    meanwhile, the write lands on the orphaned old file, never on the new
+    owner's lease.
+
+    Returns:
+        True if renewed, False if the lease was lost (reclaimed or missing)
+    """
+    lease_path = _lease_path(job_dir, job_id)
+    try:
+        f = open(lease_path, 'r+', encoding='utf-8')
+    except FileNotFoundError:
+        return False
+
+    with f:
+        try:
+            lease = json.load(f)
+        except json.JSONDecodeError:
+            return False
+        if lease.get('worker_id') != worker_id:
+            return False
+
+        lease['expires_at'] = time.time() + lease_ttl
+        lease['heartbeat_at'] = time.time()
+        f.seek(0)
+        f.truncate()
+        json.dump(lease, f)
+        f.flush()
+        os.fsync(f.fileno())
+
+        # Still ours only if the path still names the file just written
+        try:
+            return os.stat(lease_path).st_ino == os.fstat(f.fileno()).st_ino
+        except FileNotFoundError:
+            return False
+
+
+def release_lease(job_dir: str, job_id: str, worker_id: str):
+    """Drop a lease if this worker still owns it."""
+    lease_path = _lease_path(job_dir, job_id)
+    lease = _read_json(lease_path)
+    if lease and lease.get('worker_id') == worker_id:
+        try:
+            os.remove(lease_path)
+        except FileNotFoundError:
+            pass
+
+
+def reclaim_expired_leases(job_dir: str, now: float = None) -> list:
+    """
+    Remove leases whose holder stopped heartbeating.
+
+    The expired lease is first renamed to a unique name so that when several
+    workers race to reclaim it, exactly one wins.
+
+    Args:
+        job_dir: Root of the shared job directory
+        now: Current time (defaults to time.time())
+
+    Returns:
+        List of job ids whose leases were reclaimed
+    """
+    now = time.time() if now is None else now
+    leases_dir = os.path.join(job_dir, 'leases')
+    reclaimed = []
+
+    for name in os.listdir(leases_dir):
+        if not name.endswith('.lease'):
+            continue
+        lease_path = os.path.join(leases_dir, name)
+        lease = _read_json(lease_path)
+        if lease is None or lease.get('expires_at', 0) > now:
+            continue
+
+        stale_path = f"{lease_path}.{uuid.uuid4().hex}.stale"
+        try:
+            os.rename(lease_path, stale_path)
+        except FileNotFoundError:
+            continue  # Another worker reclaimed it first
+
+        # A heartbeat may have landed between the read and the rename
+        stale = _read_json(stale_path)
+        if stale and stale.get('expires_at', 0) > now:
+            try:
+                os.link(stale_path, lease_path)
+            except FileExistsError:
+                pass
+            os.remove(stale_path)
+            continue
+
+        os.remove(stale_path)
+        reclaimed.append(name[:-len('.lease')])
+
+    return reclaimed
+
+
+def _finish_job(job_dir: str, job_id: str, worker_id: str, state: str, extra: dict) -> bool:
+    """Move a leased job from pending/ to done/ or failed/."""
+    lease = read_lease(job_dir, job_id)
+    if not lease or lease.get('worker_id') != worker_id:
+        return False
+
+    pending_path = os.path.join(job_dir, 'pending', f"{job_id}.json")
+    job = _read_json(pending_path)
+    if job is None:
+        release_lease(job_dir, job_id, worker_id)
+        return False
+
+    job.update(extra)
+    job['worker_id'] = worker_id
+    job['finished_at'] = time.time()
+    _write_json_atomic(os.path.join(job_dir, state, f"{job_id}.json"), job)
+
+    try:
+        os.remove(pending_path)
+    except FileNotFoundError:
+        pass
+    release_lease(job_dir, job_id, worker_id)
+    return True
+
+
+def complete_job(job_dir: str, job_id: str, worker_id: str) -> bool:
+    """
+    Mark a job as done.
+
+    Returns:
+        True if recorded, False if this worker no longer owned the lease
+    """
+    return _finish_job(job_dir, job_id, worker_id, 'done', {})
+
+
+def fail_job(job_dir: str, job_id: str, worker_id: str, error: str) -> bool:
+    """
+    Mark a job as failed with an error message.
+
+    Returns:
+        True if recorded, False if this worker no longer owned the lease
+    """
+    return _finish_job(job_dir, job_id, worker_id, 'failed', {"error": error})
+
+
+class LeaseHeartbeat:
+    """
+    Background thread that keeps a job lease alive while the pipeline runs.
+
+    Use as a context manager around the work; check `lost` afterwards to see
+    whether the lease was reclaimed in the meantime.
+    """
+
+    def __init__(self, job_dir: str, job_id: str, worker_id: str, lease_ttl: float, interval: float):
+        self.job_dir = job_dir
+        self.job_id = job_id
+        self.worker_id = worker_id
+        self.lease_ttl = lease_ttl
+        self.interval = interval
+        self.lost = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            if not renew_lease(self.job_dir, self.job_id, self.worker_id, self.lease_ttl):
+                self.lost = True
+                return
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stop.set()
+        self._thread.join()
+        return False
+
+
+def run_worker(
+    job_dir: str,
+    process_job,
+    worker_id: str = None,
+    lease_ttl: float = 60,
+    heartbeat_interval: float = 15,
+    poll_interval: float = 5,
+    exit_when_idle: bool = False
+) -> int:
+    """
+    Claim and process jobs from the shared directory until stopped.
+
+    Args:
+        job_dir: Root of the shared job directory
+        process_job: Callable taking the job dict; raising marks the job failed
+        worker_id: Unique id for this worker (default: hostname-pid)
+        lease_ttl: Seconds a lease stays valid without a heartbeat
+        heartbeat_interval: Seconds between lease renewals
+        poll_interval: Seconds to sleep when no job is available
+        exit_when_idle: Return once the queue is empty instead of polling forever
+
+    Returns:
+        Number of jobs this worker completed
+    """
+    init_job_dir(job_dir)
+    worker_id = worker_id or default_worker_id()
+    completed = 0
+
+    print(f"👷 Worker {worker_id} watching {job_dir}")
+
+    while True:
+        for job_id in reclaim_expired_leases(job_dir):
+            print(f"  ♻ Reclaimed expired lease for job {job_id}")
+
+        job_id = None
+        for candidate in list_pending_jobs(job_dir):
+            if claim_job(job_dir, candidate, worker_id, lease_ttl):
+                job_id = candidate
+                break
+
+        if job_id is None:
+            if exit_when_idle and not list_pending_jobs(job_dir):
+                return completed
+            time.sleep(poll_interval)
+            continue
+
+        job = _read_json(os.path.join(job_dir, 'pending', f"{job_id}.json"))
+        if job is None:
+            release_lease(job_dir, job_id, worker_id)
+            continue
+
+        print(f"\n📥 Claimed job {job_id}: {job['video_path']}")
+        error = None
+        with LeaseHeartbeat(job_dir, job_id, worker_id, lease_ttl, heartbeat_interval) as heartbeat:
+            try:
+                process_job(job)
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+
+        if heartbeat.lost:
+            print(f"  ⚠ Lease on job {job_id} was lost; leaving it to its new owner")
+        elif error:
+            fail_job(job_dir, job_id, worker_id, error)
+            print(f"  ✗ Job {job_id} failed: {error}")
+        elif complete_job(job_dir, job_id, worker_id):
+            completed += 1
+            print(f"  ✓ Job {job_id} done")
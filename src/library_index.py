@@ -0,0 +1,263 @@
+"""
+Library index module for searching past runs.
+
+Transcripts, clip reports and video metadata written by the pipeline are
+loaded into a local SQLite database with an FTS5 full-text index, one row per
+transcript segment, suggested clip, chapter or video description. Indexing is
+incremental: a file is only re-read when its size or mtime changed, and only
+re-indexed when its content hash changed too.
+"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+
+# Output files picked up by the index, by filename suffix
+INDEXED_SUFFIXES = {
+    '_transcript.json': 'transcript',
+    '_clips.json': 'clip',
+    '_metadata.json': 'metadata',
+}
+
+SNIPPET_TOKENS = 12
+
+
+def open_library(db_path: str) -> sqlite3.Connection:
+    """
+    Open (and create if needed) the library index.
+
+    Args:
+        db_path: Path to the SQLite database file
+
+    Returns:
+        Open sqlite3 connection
+    """
+    os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+    conn = sqlite3.connect(db_path)
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS files (
+            path TEXT PRIMARY KEY,
+            size INTEGER NOT NULL,
+            mtime_ns INTEGER NOT NULL,
+            sha1 TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS videos (
+            video_name TEXT PRIMARY KEY,
+            video_path TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS moments (
+            id INTEGER PRIMARY KEY,
+            source TEXT NOT NULL,
+            video_name TEXT NOT NULL,
+            kind TEXT NOT NULL,
+            start_time REAL,
+            end_time REAL,
+            text TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS moments_by_source ON moments (source);
+        CREATE VIRTUAL TABLE IF NOT EXISTS moments_fts USING fts5(
+            text,
+            content='moments',
+            content_rowid='id',
+            tokenize='porter unicode61'
+        );
+    """)
+    return conn
+
+
+def _parse_timestamp(value: str):
+    """Seconds from an "MM:SS" or "HH:MM:SS" chapter timestamp, or None."""
+    try:
+        seconds = 0.0
+        for part in str(value).strip().split(':'):
+            seconds = seconds * 60 + float(part)
+        return seconds
+    except ValueError:
+        return None
+
+
+def _file_moments(kind: str, data: dict) -> list:
+    """(start, end, text) rows for one output file."""
+    if kind == 'transcript':
+        return [
+            (seg['start'], seg['end'], seg['text'].strip())
+            for seg in data.get('segments', [])
+            if seg.get('text', '').strip()
+        ]
+
+    if kind == 'clip':
+        rows = []
+        for clip in data.get('clips', []):
+            text = ' '.join(
+                str(clip[key]) for key in ('title', 'hook', 'caption', 'reason', 'thumbnail_text')
+                if clip.get(key)
+            )
+            rows.append((clip['start_time'], clip['end_time'], text))
+        return rows
+
+    rows = [(None, None, ' '.join(filter(None, [
+        data.get('title', ''),
+        data.get('description', ''),
+        ' '.join(data.get('tags', [])),
+    ])))]
+    for moment in data.get('key_moments', []):
+        rows.append((_parse_timestamp(moment.get('timestamp', '')), None, moment.get('description', '')))
+    return rows
+
+
+def _index_file(conn: sqlite3.Connection, path: str, kind: str, video_name: str, data: dict):
+    """Replace the rows indexed for `path` with its current content."""
+    _remove_file(conn, path)
+
+    if kind == 'clip':
+        video_name = data.get('video_name', video_name)
+        if data.get('video_path'):
+            conn.execute(
+                "INSERT OR REPLACE INTO videos (video_name, video_path) VALUES (?, ?)",
+                (video_name, data['video_path'])
+            )
+
+    for start, end, text in _file_moments(kind, data):
+        cursor = conn.execute(
+            "INSERT INTO moments (source, video_name, kind, start_time, end_time, text) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (path, video_name, kind, start, end, text)
+        )
+        conn.execute(
+            "INSERT INTO moments_fts (rowid, text) VALUES (?, ?)",
+            (cursor.lastrowid, text)
+        )
+
+
+def _remove_file(conn: sqlite3.Connection, path: str):
+    """Drop every row indexed from `path`."""
+    conn.execute(
+        "INSERT INTO moments_fts (moments_fts, rowid, text) "
+        "SELECT 'delete', id, text FROM moments WHERE source = ?",
+        (path,)
+    )
+    conn.execute("DELETE FROM moments WHERE source = ?", (path,))
+
+
+def update_library(conn: sqlite3.Connection, directories: list) -> dict:
+    """
+    Bring the index up to date with the output files in `directories`.
+
+    Unchanged files (same size and mtime) are skipped without being read;
+    files whose content hash is unchanged are not re-indexed. Files that no
+    longer exist are removed from the index.
+
+    Args:
+        conn: Connection from open_library
+        directories: Directories to scan (e.g. transcripts and reports)
+
+    Returns:
+        Dict with counts: scanned, indexed, unchanged, removed
+    """
+    known = {
+        path: (size, mtime_ns, sha1)
+        for path, size, mtime_ns, sha1 in conn.execute("SELECT path, size, mtime_ns, sha1 FROM files")
+    }
+    counts = {'scanned': 0, 'indexed': 0, 'unchanged': 0, 'removed': 0}
+    seen = set()
+
+    with conn:
+        for directory in directories:
+            if not os.path.isdir(directory):
+                continue
+            for entry in os.scandir(directory):
+                suffix = next((s for s in INDEXED_SUFFIXES if entry.name.endswith(s)), None)
+                if suffix is None or not entry.is_file():
+                    continue
+
+                path = os.path.abspath(entry.path)
+                seen.add(path)
+                counts['scanned'] += 1
+                stat = entry.stat()
+                previous = known.get(path)
+                if previous and previous[:2] == (stat.st_size, stat.st_mtime_ns):
+                    counts['unchanged'] += 1
+                    continue
+
+                with open(path, 'rb') as f:
+                    content = f.read()
+                sha1 = hashlib.sha1(content).hexdigest()
+
+                if not previous or previous[2] != sha1:
+                    try:
+                        data = json.loads(content)
+                    except ValueError:
+                        print(f"  ⚠ Skipping unreadable file: {path}")
+                        continue
+                    video_name = entry.name[:-len(suffix)]
+                    _index_file(conn, path, INDEXED_SUFFIXES[suffix], video_name, data)
+                    counts['indexed'] += 1
+                else:
+                    counts['unchanged'] += 1
+
+                conn.execute(
+                    "INSERT OR REPLACE INTO files (path, size, mtime_ns, sha1) VALUES (?, ?, ?, ?)",
+                    (path, stat.st_size, stat.st_mtime_ns, sha1)
+                )
+
+        scanned_dirs = [os.path.abspath(d) for d in directories]
+        for path in known:
+            if path not in seen and os.path.dirname(path) in scanned_dirs:
+                _remove_file(conn, path)
+                conn.execute("DELETE FROM files WHERE path = ?", (path,))
+                counts['removed'] += 1
+
+    return counts
+
+
+def _match_query(query: str) -> str:
+    """Turn free text into an FTS5 query matching all of its words."""
+    words = re.findall(r'\w+', query)
+    return ' '.join(f'"{word}"' for word in words)
+
+
+def search_library(conn: sqlite3.Connection, query: str, limit: int = 10) -> list:
+    """
+    Find indexed moments matching all words of `query`, best matches first.
+
+    Args:
+        conn: Connection from open_library
+        query: Free-text search
+        limit: Maximum number of results
+
+    Returns:
+        List of dicts with video_name, video_path (None if unknown), kind
+        ('transcript', 'clip' or 'metadata'), start_time, end_time (either
+        may be None) and snippet (matching words wrapped in [ ])
+    """
+    match = _match_query(query)
+    if not match:
+        return []
+
+    rows = conn.execute(
+        f"""
+        SELECT m.video_name, v.video_path, m.kind, m.start_time, m.end_time,
+               snippet(moments_fts, 0, '[', ']', '…', {SNIPPET_TOKENS})
+        FROM moments_fts
+        JOIN moments m ON m.id = moments_fts.rowid
+        LEFT JOIN videos v ON v.video_name = m.video_name
+        WHERE moments_fts MATCH ?
+        ORDER BY rank
+        LIMIT ?
+        """,
+        (match, limit)
+    ).fetchall()
+
+    return [
+        {
+            'video_name': video_name,
+            'video_path': video_path,
+            'kind': kind,
+            'start_time': start_time,
+            'end_time': end_time,
+            'snippet': snippet,
+        }
+        for video_name, video_path, kind, start_time, end_time, snippet in rows
+    ]
@@ -0,0 +1,317 @@
+"""
+Shared gateway for Claude API calls.
+
+All modules send requests through `create_message` so that a batch of videos
+shares one pooled HTTP client, stays under the account's requests/minute and
+tokens/minute limits, and backs off together when the API returns 429/529.
+"""
+
+import random
+import threading
+import time
+from collections import Counter, deque
+
+import anthropic
+from src.metrics import registry
+from config import (
+    get_api_key,
+    LLM_MAX_CONCURRENCY,
+    LLM_REQUESTS_PER_MINUTE,
+    LLM_TOKENS_PER_MINUTE,
+    LLM_MAX_RETRIES,
+    LLM_BACKOFF_BASE,
+    LLM_BACKOFF_MAX
+)
+
+# Status codes worth retrying: rate limited, overloaded, transient server errors
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504, 529}
+
+# Recent calls kept for latency percentiles
+LATENCY_WINDOW = 1000
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket refilled continuously at `rate_per_minute`.
+
+    `acquire` blocks until enough capacity is available. `adjust` lets the
+    caller correct an estimate once the real cost is known; the level may go
+    negative, which simply delays the next caller.
+    """
+
+    def __init__(self, rate_per_minute: float):
+        self.capacity = float(rate_per_minute)
+        self.rate = rate_per_minute / 60.0
+        self.level = self.capacity
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def acquire(self, amount: float = 1.0) -> float:
+        """
+        Take `amount` from the bucket, waiting if necessary.
+
+        Returns:
+            Seconds spent waiting
+        """
+        # Requests larger than the whole bucket would otherwise wait forever
+        amount = min(amount, self.capacity)
+        waited = 0.0
+        while True:
+            with self.lock:
+                self._refill()
+                if self.level >= amount:
+                    self.level -= amount
+                    return waited
+                delay = (amount - self.level) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+    def adjust(self, amount: float):
+        """Add (positive) or remove (negative) capacity after the fact."""
+        with self.lock:
+            self._refill()
+            self.level = min(self.capacity, self.level + amount)
+
+
+class LLMMetrics:
+    """
+    Running latency and token totals, aggregated across threads.
+
+    Only totals are kept per call; latency percentiles cover the last
+    LATENCY_WINDOW calls, so a long-running worker uses constant memory.
+    """
+
+    TOTALS = (
+        'calls', 'failed_calls', 'retries', 'throttle_wait_seconds',
+        'input_tokens', 'output_tokens',
+        'cache_read_input_tokens', 'cache_creation_input_tokens', 'latency_total',
+    )
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self.lock = threading.Lock()
+        self.totals = dict.fromkeys(self.TOTALS, 0)
+        self.latencies = deque(maxlen=window)  # (call number, latency)
+        self.calls_by_label = Counter()
+
+    def record(self, label: str, ok: bool, latency: float, retries: int, throttle_wait: float,
+               input_tokens: int = 0, output_tokens: int = 0,
+               cache_read_input_tokens: int = 0, cache_creation_input_tokens: int = 0):
+        """Add one finished call (successful or not) to the totals."""
+        with self.lock:
+            totals = self.totals
+            totals['calls'] += 1
+            totals['failed_calls'] += 0 if ok else 1
+            totals['retries'] += retries
+            totals['throttle_wait_seconds'] += throttle_wait
+            totals['input_tokens'] += input_tokens
+            totals['output_tokens'] += output_tokens
+            totals['cache_read_input_tokens'] += cache_read_input_tokens
+            totals['cache_creation_input_tokens'] += cache_creation_input_tokens
+            totals['latency_total'] += latency
+            self.latencies.append((totals['calls'], latency))
+            self.calls_by_label[label] += 1
+
+    def mark(self) -> dict:
+        """
+        Return a position to pass to `summary(since=...)` later.
+
+        Returns:
+            Copy of the totals recorded so far
+        """
+        with self.lock:
+            return dict(self.totals)
+
+    def summary(self, since: dict = None) -> dict:
+        """
+        Aggregate recorded calls.
+
+        Args:
+            since: Only include calls recorded after this `mark()` (latency
+                percentiles only see those still in the latency window)
+
+        Returns:
+            Dict with call counts, retries, token totals and latency stats
+        """
+        since = since or dict.fromkeys(self.TOTALS, 0)
+        with self.lock:
+            stats = {key: value - since[key] for key, value in self.totals.items()}
+            latencies = sorted(latency for n, latency in self.latencies if n > since['calls'])
+
+        def percentile(p):
+            if not latencies:
+                return 0.0
+            return latencies[min(len(latencies) - 1, int(p * len(latencies)))]
+
+        stats['throttle_wait_seconds'] = round(stats['throttle_wait_seconds'], 3)
+        stats['latency_total'] = round(stats['latency_total'], 3)
+        stats['latency_p50'] = round(percentile(0.5), 3)
+        stats['latency_p95'] = round(percentile(0.95), 3)
+        stats['latency_max'] = round(latencies[-1], 3) if latencies else 0.0
+        return stats
+
+    def collect(self) -> list:
+        """
+        Samples for the metrics registry: call/token counters, latency and
+        the prompt-cache hit rate (share of input tokens read from cache).
+
+        Returns:
+            List of (name, type, value, labels) tuples
+        """
+        stats = self.summary()
+        with self.lock:
+            calls_by_label = dict(self.calls_by_label)
+        cached = stats['cache_read_input_tokens']
+        total_input = stats['input_tokens'] + stats['cache_creation_input_tokens'] + cached
+        return [
+            *(('llm_calls_total', 'counter', n, {'label': label}) for label, n in calls_by_label.items()),
+            ('llm_failed_calls_total', 'counter', stats['failed_calls'], {}),
+            ('llm_retries_total', 'counter', stats['retries'], {}),
+            ('llm_throttle_wait_seconds_total', 'counter', stats['throttle_wait_seconds'], {}),
+            ('llm_input_tokens_total', 'counter', stats['input_tokens'], {'cache': 'none'}),
+            ('llm_input_tokens_total', 'counter', stats['cache_creation_input_tokens'], {'cache': 'write'}),
+            ('llm_input_tokens_total', 'counter', cached, {'cache': 'read'}),
+            ('llm_output_tokens_total', 'counter', stats['output_tokens'], {}),
+            ('llm_latency_seconds_total', 'counter', stats['latency_total'], {}),
+            ('llm_latency_seconds', 'gauge', stats['latency_p50'], {'quantile': '0.5'}),
+            ('llm_latency_seconds', 'gauge', stats['latency_p95'], {'quantile': '0.95'}),
+            ('prompt_cache_hit_ratio', 'gauge', cached / total_input if total_input else 0.0, {}),
+        ]
+
+
+_client = None
+_client_lock = threading.Lock()
+_concurrency = threading.BoundedSemaphore(LLM_MAX_CONCURRENCY)
+_request_bucket = TokenBucket(LLM_REQUESTS_PER_MINUTE)
+_token_bucket = TokenBucket(LLM_TOKENS_PER_MINUTE)
+metrics = LLMMetrics()
+registry.add_collector(metrics.collect)
+
+
+def get_client() -> anthropic.Anthropic:
+    """
+    Return the process-wide Anthropic client, creating it on first use.
+
+    The SDK's own retries are disabled so that backoff is coordinated here.
+    ANTHROPIC_BASE_URL is honoured by the SDK, which lets a local stand-in
+    server be used for testing.
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = anthropic.Anthropic(api_key=get_api_key(), max_retries=0)
+        return _client
+
+
+def estimate_tokens(messages: list, max_tokens: int) -> int:
+    """
+    Rough token cost of a request (~4 characters per token) for rate limiting.
+
+    Args:
+        messages: Messages list as passed to the API
+        max_tokens: Output token cap of the request
+
+    Returns:
+        Estimated input + output tokens
+    """
+    chars = 0
+    for message in messages:
+        content = message.get('content', '')
+        if isinstance(content, str):
+            chars += len(content)
+        else:
+            chars += sum(len(block.get('text', '')) for block in content)
+    return chars // 4 + max_tokens
+
+
+def _retry_delay(error: Exception, attempt: int) -> float:
+    """Full-jitter exponential backoff, never shorter than the server's retry-after."""
+    delay = random.uniform(0, min(LLM_BACKOFF_MAX, LLM_BACKOFF_BASE * (2 ** attempt)))
+
+    response = getattr(error, 'response', None)
+    if response is not None:
+        retry_after = response.headers.get('retry-after')
+        if retry_after:
+            try:
+                delay = max(delay, float(retry_after))
+            except ValueError:
+                pass
+
+    return delay
+
+
+def _is_retryable(error: Exception) -> bool:
+    if isinstance(error, anthropic.APIConnectionError):
+        return True
+    if isinstance(error, anthropic.APIStatusError):
+        return error.status_code in RETRYABLE_STATUS_CODES
+    return False
+
+
+def create_message(label: str = "llm", **kwargs):
+    """
+    Send a Messages API request through the shared client and limiters.
+
+    Args:
+        label: Name recorded with the call's metrics (e.g. "highlights")
+        **kwargs: Arguments for client.messages.create (model, messages, ...)
+
+    Returns:
+        The Messages API response
+
+    Raises:
+        anthropic.APIError: If the request fails with a non-retryable error
+            or retries are exhausted
+    """
+    client = get_client()
+    estimate = estimate_tokens(kwargs.get('messages', []), kwargs.get('max_tokens', 0))
+
+    retries = 0
+    throttle_wait = 0.0
+    started = time.monotonic()
+
+    while True:
+        throttle_wait += _request_bucket.acquire(1)
+        throttle_wait += _token_bucket.acquire(estimate)
+
+        try:
+            with _concurrency:
+                message = client.messages.create(**kwargs)
+        except anthropic.APIError as e:
+            # A rejected request used no tokens; give the estimate back
+            _token_bucket.adjust(estimate)
+            if not _is_retryable(e) or retries >= LLM_MAX_RETRIES:
+                metrics.record(
+                    label=label, ok=False, latency=time.monotonic() - started,
+                    retries=retries, throttle_wait=throttle_wait,
+                    input_tokens=0, output_tokens=0
+                )
+                raise
+            delay = _retry_delay(e, retries)
+            status = getattr(e, 'status_code', 'connection error')
+            print(f"  ⚠ Claude API {status}, retrying in {delay:.1f}s...")
+            # Hold back the shared bucket so concurrent callers back off too
+            _request_bucket.adjust(-delay * _request_bucket.rate)
+            time.sleep(delay)
+            retries += 1
+            continue
+
+        usage = message.usage
+        input_tokens = usage.input_tokens
+        output_tokens = usage.output_tokens
+        cache_read = getattr(usage, 'cache_read_input_tokens', 0) or 0
+        cache_creation = getattr(usage, 'cache_creation_input_tokens', 0) or 0
+        _token_bucket.adjust(estimate - (input_tokens + output_tokens + cache_creation))
+
+        metrics.record(
+            label=label, ok=True, latency=time.monotonic() - started,
+            retries=retries, throttle_wait=throttle_wait,
+            input_tokens=input_tokens, output_tokens=output_tokens,
+            cache_read_input_tokens=cache_read,
+            cache_creation_input_tokens=cache_creation
+        )
+        return message
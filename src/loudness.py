@@ -0,0 +1,175 @@
+"""
+Loudness module for broadcast-consistent clip audio.
+
+The source's EBU R128 loudness is measured once, during audio extraction, as
+a 100 ms series of momentary loudness, short-term loudness and true peak.
+ebur128's own true-peak value is the running maximum since the start of the
+file, so the peak of each 100 ms frame is measured separately, by `astats` on
+a 4x oversampled copy of the audio.
+From that series the integrated loudness, loudness range and true peak of any
+clip range can be derived without decoding the audio again, and fed to
+FFmpeg's `loudnorm` filter in single-pass linear mode while the clip is
+encoded.
+"""
+
+import json
+
+import numpy as np
+
+from config import LOUDNESS_TARGET_I, LOUDNESS_TARGET_TP, LOUDNESS_TARGET_LRA
+
+FRAME_SECONDS = 0.1  # ebur128 reports every 100 ms
+MOMENTARY_SECONDS = 0.4
+SHORT_TERM_SECONDS = 3.0
+ABSOLUTE_GATE = -70.0  # LUFS
+RELATIVE_GATE_I = -10.0  # LU, for integrated loudness
+RELATIVE_GATE_LRA = -20.0  # LU, for loudness range
+
+# Appended to audio branches in extract_audio; each writes per-frame stats to a file
+EBUR128_FILTER = "ebur128=metadata=1,ametadata=mode=print:file={path}"
+PEAK_FILTER = (
+    "aresample=192000,asetnsamples=n=19200:p=0,"
+    "astats=metadata=1:reset=1:measure_perchannel=none:measure_overall=Peak_level,"
+    "ametadata=mode=print:file={path}"
+)
+
+
+def parse_ebur128_log(log_path: str, peak_log_path: str) -> dict:
+    """
+    Parse the per-frame output of the EBUR128_FILTER and PEAK_FILTER chains.
+
+    Both chains emit 100 ms frames from the start of the audio, so their
+    frames line up one to one.
+
+    Args:
+        log_path: File written by the EBUR128_FILTER chain
+        peak_log_path: File written by the PEAK_FILTER chain
+
+    Returns:
+        Dict of equal-length lists: 't' (frame start, seconds), 'M' and 'S'
+        (momentary / short-term loudness, LUFS) and 'TP' (true peak of the
+        frame alone, dBTP)
+    """
+    stats = {'t': [], 'M': [], 'S': [], 'TP': []}
+    with open(log_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.startswith('frame:'):
+                pts_time = line.rsplit('pts_time:', 1)[1]
+                stats['t'].append(round(float(pts_time), 3))
+            elif line.startswith('lavfi.r128.M='):
+                stats['M'].append(round(float(line.split('=', 1)[1]), 2))
+            elif line.startswith('lavfi.r128.S='):
+                stats['S'].append(round(float(line.split('=', 1)[1]), 2))
+
+    with open(peak_log_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.startswith('lavfi.astats.Overall.Peak_level='):
+                peak = float(line.split('=', 1)[1])  # dBFS, "-inf" for digital silence
+                stats['TP'].append(round(max(peak, -120.0), 2))
+
+    # The oversampled branch may end a frame early or late
+    n_frames = len(stats['t'])
+    stats['TP'] = (stats['TP'] + [-120.0] * n_frames)[:n_frames]
+    return stats
+
+
+def save_loudness(stats: dict, output_path: str):
+    """
+    Cache loudness stats as JSON.
+
+    Args:
+        stats: Result of parse_ebur128_log
+        output_path: Where to save the JSON file
+    """
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(stats, f)
+
+
+def load_loudness(path: str) -> dict:
+    """
+    Load cached loudness stats.
+
+    Args:
+        path: JSON file written by save_loudness
+
+    Returns:
+        Dict of NumPy arrays keyed like parse_ebur128_log's result
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        stats = json.load(f)
+    return {key: np.asarray(values, dtype=np.float64) for key, values in stats.items()}
+
+
+def _power_mean_lufs(values: np.ndarray) -> float:
+    return float(10 * np.log10(np.mean(10 ** (values / 10))))
+
+
+def measure_range(stats: dict, start_time: float, end_time: float):
+    """
+    Derive loudnorm input measurements for a time range of the source.
+
+    Uses the BS.1770 gated mean of the 400 ms momentary blocks inside the
+    range for integrated loudness, and the 10th-95th percentile spread of
+    gated 3 s short-term values for loudness range.
+
+    Args:
+        stats: Result of load_loudness
+        start_time: Range start in seconds
+        end_time: Range end in seconds
+
+    Returns:
+        Dict with input_i, input_lra, input_tp and input_thresh, or None if
+        the range holds no audible audio
+    """
+    t = stats['t']
+    frame_end = t + FRAME_SECONDS
+
+    momentary = stats['M'][(frame_end - MOMENTARY_SECONDS >= start_time - 1e-6) & (frame_end <= end_time + 1e-6)]
+    momentary = momentary[momentary > ABSOLUTE_GATE]
+    if len(momentary) == 0:
+        return None
+
+    threshold = _power_mean_lufs(momentary) + RELATIVE_GATE_I
+    gated = momentary[momentary > threshold]
+    integrated = _power_mean_lufs(gated) if len(gated) else threshold
+
+    short_term = stats['S'][(frame_end - SHORT_TERM_SECONDS >= start_time - 1e-6) & (frame_end <= end_time + 1e-6)]
+    short_term = short_term[short_term > ABSOLUTE_GATE]
+    loudness_range = 0.0
+    if len(short_term):
+        short_term = short_term[short_term > _power_mean_lufs(short_term) + RELATIVE_GATE_LRA]
+        if len(short_term):
+            low, high = np.percentile(short_term, [10, 95])
+            loudness_range = float(high - low)
+
+    in_range = (t >= start_time) & (t < end_time)
+    true_peak = float(stats['TP'][in_range].max()) if in_range.any() else -120.0
+
+    return {
+        "input_i": round(integrated, 2),
+        "input_lra": round(loudness_range, 2),
+        "input_tp": round(true_peak, 2),
+        "input_thresh": round(threshold, 2),
+    }
+
+
+def build_loudnorm_filter(measurement: dict) -> str:
+    """
+    Build a single-pass linear loudnorm filter from precomputed measurements.
+
+    Args:
+        measurement: Result of measure_range
+
+    Returns:
+        Audio filter string for -af
+    """
+    # loudnorm reads measured_LRA=0 as "not measured" and falls back to
+    # dynamic mode, so a perfectly steady clip is given a hair of range
+    return (
+        f"loudnorm=I={LOUDNESS_TARGET_I}:TP={LOUDNESS_TARGET_TP}:LRA={LOUDNESS_TARGET_LRA}"
+        f":measured_I={measurement['input_i']}"
+        f":measured_LRA={max(measurement['input_lra'], 0.01)}"
+        f":measured_TP={measurement['input_tp']}"
+        f":measured_thresh={measurement['input_thresh']}"
+        ":offset=0:linear=true"
+    )
@@ -0,0 +1,44 @@
+"""
+Memory measurement helpers for low-memory processing.
+
+Reports the process's resident set size so long transcriptions can size
+their audio windows to a fixed RSS budget. Returns None where the platform
+offers no cheap way to measure (e.g. Windows without extra packages).
+"""
+
+import os
+import sys
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def current_rss_mb():
+    """
+    Current resident set size of this process in MB.
+
+    Returns:
+        RSS in MB, or None if it cannot be measured on this platform
+    """
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, AttributeError):
+        return peak_rss_mb()
+
+
+def peak_rss_mb():
+    """
+    Peak resident set size of this process so far in MB.
+
+    Returns:
+        Peak RSS in MB, or None if it cannot be measured on this platform
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
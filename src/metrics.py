@@ -0,0 +1,315 @@
+"""
+Metrics module for live progress and run statistics.
+
+Pipeline stages, FFmpeg runs, Whisper and the Claude gateway all report into
+one thread-safe registry. The registry can be scraped as Prometheus text from
+a small HTTP endpoint and is appended to a JSON Lines log every few seconds,
+so a batch of workers can be watched while it runs. Long-running tasks also
+get a live progress line (position, speed, ETA) when output is a terminal.
+"""
+
+import json
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PREFIX = 'shorts_'
+LOG_PROGRESS_EVERY = 30  # seconds between progress lines when output isn't a terminal
+
+
+def _format_labels(labels: tuple) -> str:
+    if not labels:
+        return ''
+    escaped = (
+        (key, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for key, value in labels
+    )
+    return '{' + ','.join(f'{key}="{value}"' for key, value in escaped) + '}'
+
+
+class MetricsRegistry:
+    """
+    Counters, gauges and summaries keyed by name and labels.
+
+    Collectors are callables returning extra (name, type, value, labels)
+    samples; they are called whenever the registry is read, for values that
+    are cheaper to compute on demand (e.g. queue depth, LLM usage).
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.values = {}  # (name, suffix, labels) -> value
+        self.types = {}
+        self.descriptions = {}
+        self.collectors = []
+
+    def _add(self, name: str, kind: str, description: str, suffix: str, labels: dict, value: float, replace: bool):
+        key = (name, suffix, tuple(sorted(labels.items())))
+        with self.lock:
+            self.types.setdefault(name, kind)
+            if description:
+                self.descriptions.setdefault(name, description)
+            self.values[key] = value if replace else self.values.get(key, 0.0) + value
+
+    def inc(self, name: str, amount: float = 1.0, description: str = '', **labels):
+        """Add `amount` to a counter."""
+        self._add(name, 'counter', description, '', labels, amount, replace=False)
+
+    def set(self, name: str, value: float, description: str = '', **labels):
+        """Set a gauge."""
+        self._add(name, 'gauge', description, '', labels, float(value), replace=True)
+
+    def observe(self, name: str, value: float, description: str = '', **labels):
+        """Record one observation in a summary (exported as _sum and _count)."""
+        self._add(name, 'summary', description, '_sum', labels, value, replace=False)
+        self._add(name, 'summary', description, '_count', labels, 1.0, replace=False)
+
+    def get(self, name: str, **labels) -> float:
+        """Current value of a counter or gauge (0 if never set)."""
+        with self.lock:
+            return self.values.get((name, '', tuple(sorted(labels.items()))), 0.0)
+
+    def add_collector(self, collector):
+        """
+        Register a callable returning a list of (name, type, value, labels) samples.
+
+        Args:
+            collector: Called whenever the registry is read; errors are ignored
+        """
+        with self.lock:
+            self.collectors.append(collector)
+
+    def samples(self) -> list:
+        """
+        All current samples.
+
+        Returns:
+            List of (name, suffix, type, labels tuple, value), sorted by name
+        """
+        with self.lock:
+            result = [
+                (name, suffix, self.types[name], labels, value)
+                for (name, suffix, labels), value in self.values.items()
+            ]
+            collectors = list(self.collectors)
+
+        for collector in collectors:
+            try:
+                for name, kind, value, labels in collector():
+                    result.append((name, '', kind, tuple(sorted(labels.items())), float(value)))
+            except Exception:
+                continue
+        return sorted(result, key=lambda sample: (sample[0], sample[3], sample[1]))
+
+    def render_prometheus(self) -> str:
+        """
+        Render all samples in the Prometheus text exposition format.
+
+        Returns:
+            Text for a /metrics response
+        """
+        lines = []
+        declared = set()
+        for name, suffix, kind, labels, value in self.samples():
+            if name not in declared:
+                declared.add(name)
+                if name in self.descriptions:
+                    lines.append(f"# HELP {PREFIX}{name} {self.descriptions[name]}")
+                lines.append(f"# TYPE {PREFIX}{name} {kind}")
+            lines.append(f"{PREFIX}{name}{suffix}{_format_labels(labels)} {value:g}")
+        return '\n'.join(lines) + '\n'
+
+    def snapshot(self) -> dict:
+        """
+        All samples as a flat dict, for the JSON log.
+
+        Returns:
+            Dict with a unix timestamp and 'metrics': {"name{labels}": value}
+        """
+        return {
+            'time': round(time.time(), 3),
+            'metrics': {
+                f"{name}{suffix}{_format_labels(labels)}": value
+                for name, suffix, kind, labels, value in self.samples()
+            },
+        }
+
+
+registry = MetricsRegistry()
+
+
+def start_metrics_server(port: int, host: str = '127.0.0.1') -> ThreadingHTTPServer:
+    """
+    Serve the registry as Prometheus text on http://host:port/metrics.
+
+    Args:
+        port: TCP port to listen on
+        host: Interface to bind (local only by default; use 0.0.0.0 to let
+            a Prometheus server on another machine scrape it)
+
+    Returns:
+        The running server (stops with the process; call shutdown() to stop early)
+    """
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] != '/metrics':
+                self.send_error(404)
+                return
+            body = registry.render_prometheus().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+class MetricsLogger:
+    """
+    Context manager appending a registry snapshot to a JSON Lines file
+    every `interval` seconds, plus a final one on exit.
+    """
+
+    def __init__(self, log_path: str, interval: float):
+        self.log_path = log_path
+        self.interval = interval
+        self.stop = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def _write(self):
+        with open(self.log_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(registry.snapshot()) + '\n')
+
+    def _run(self):
+        while not self.stop.wait(self.interval):
+            self._write()
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop.set()
+        self.thread.join()
+        self._write()
+        return False
+
+
+def _clock(seconds: float) -> str:
+    seconds = int(max(seconds, 0))
+    hours, rest = divmod(seconds, 3600)
+    return f"{hours}:{rest // 60:02d}:{rest % 60:02d}" if hours else f"{rest // 60}:{rest % 60:02d}"
+
+
+class ProgressTracker:
+    """
+    Live position, speed and ETA of one media task (an FFmpeg run, Whisper).
+
+    Updates the shorts_progress_* gauges for `task` and, on a terminal,
+    redraws a one-line status (elsewhere it prints one every
+    LOG_PROGRESS_EVERY seconds). `finish()` records the run's duration and
+    realtime factor (media seconds processed per wall-clock second).
+    """
+
+    def __init__(self, task: str, total_seconds: float = None, label: str = None):
+        self.task = task
+        self.label = label or task
+        self.total_seconds = total_seconds
+        self.done_seconds = 0.0
+        self.started = time.monotonic()
+        self.live = sys.stdout.isatty()
+        self.drawn = False
+        self.last_logged = 0.0
+
+    def update(self, done_seconds: float, speed: float = None):
+        """
+        Report progress.
+
+        Args:
+            done_seconds: Media seconds processed so far
+            speed: Processing speed as a multiple of realtime, if the tool
+                reports one (otherwise derived from wall-clock time)
+        """
+        self.done_seconds = max(self.done_seconds, done_seconds)
+        elapsed = time.monotonic() - self.started
+        if speed is None:
+            speed = self.done_seconds / elapsed if elapsed > 0 else 0.0
+
+        registry.set('progress_seconds', self.done_seconds,
+                     'Media seconds processed by the running task', task=self.task)
+        registry.set('progress_speed', speed,
+                     'Speed of the running task as a multiple of realtime', task=self.task)
+
+        status = f"   {self.label}: {_clock(self.done_seconds)}"
+        if self.total_seconds:
+            remaining = max(self.total_seconds - self.done_seconds, 0.0)
+            eta = remaining / speed if speed > 0 else None
+            registry.set('progress_eta_seconds', eta if eta is not None else -1,
+                         'Estimated seconds left for the running task', task=self.task)
+            status += f" / {_clock(self.total_seconds)}"
+            status += f" ({speed:.1f}x, ETA {_clock(eta) if eta is not None else '?'})"
+        else:
+            status += f" ({speed:.1f}x)"
+
+        if self.live:
+            sys.stdout.write('\r' + status.ljust(72))
+            sys.stdout.flush()
+            self.drawn = True
+        elif elapsed - self.last_logged >= LOG_PROGRESS_EVERY:
+            # Not a terminal (e.g. a worker's log file): a plain line now and then
+            print(status)
+            self.last_logged = elapsed
+
+    def finish(self, failed: bool = False) -> float:
+        """
+        Record the task's duration and realtime factor and clear the status line.
+
+        Args:
+            failed: The task failed; count it instead of recording its timing
+
+        Returns:
+            Realtime factor of the whole run (0 if nothing was processed)
+        """
+        if self.drawn:
+            sys.stdout.write('\r' + ' ' * 72 + '\r')
+            sys.stdout.flush()
+
+        if failed:
+            registry.inc('task_failures_total', 1, 'Media tasks that failed', task=self.task)
+            return 0.0
+
+        elapsed = time.monotonic() - self.started
+        realtime_factor = self.done_seconds / elapsed if elapsed > 0 else 0.0
+        registry.observe('task_seconds', elapsed, 'Wall-clock seconds per media task', task=self.task)
+        registry.set('task_realtime_factor', realtime_factor,
+                     'Media seconds per wall-clock second of the last run', task=self.task)
+        return realtime_factor
+
+
+@contextmanager
+def timed_stage(stage: str, media_seconds: float = None):
+    """
+    Record how long a pipeline stage takes.
+
+    Args:
+        stage: Stage name, used as the `stage` label
+        media_seconds: Length of the media the stage processed; if given,
+            the stage's realtime factor is recorded too
+    """
+    started = time.monotonic()
+    try:
+        yield
+    finally:
+        elapsed = time.monotonic() - started
+        registry.observe('stage_seconds', elapsed, 'Wall-clock seconds per pipeline stage', stage=stage)
+        if media_seconds and elapsed > 0:
+            registry.set('stage_realtime_factor', media_seconds / elapsed,
+                         'Media seconds per wall-clock second of the last stage run', stage=stage)
@@ -0,0 +1,272 @@
+"""
+Thumbnail generation module for picking and rendering a frame per clip.
+
+One FFmpeg pass decodes the span covering all clips, and a `select` filter
+keeps candidate frames inside the clip ranges. The candidates are piped out
+at low resolution for scoring and written as full-size JPEGs. The frames are
+scored together with NumPy (sharpness, exposure, contrast, skin tones as a
+face heuristic, and the change from the previous candidate as a motion/scene-
+cut penalty). The winners get the clip's `thumbnail_text` burned in by a
+second FFmpeg run that reads only the chosen stills.
+"""
+
+import os
+import re
+import subprocess
+import tempfile
+
+import numpy as np
+
+from config import THUMBNAIL_SAMPLE_INTERVAL
+from src.captions import write_title_ass
+from src.clip_generator import build_profile_filter
+
+# Thumbnail sizes written for every clip (name -> frame size and file suffix)
+THUMBNAIL_PROFILES = {
+    'horizontal': {'width': 1280, 'height': 720, 'suffix': 'thumb'},
+    'vertical': {'width': 1080, 'height': 1920, 'suffix': 'thumb_9x16'},
+}
+
+# Candidates are scored at this size
+SCORE_WIDTH = 256
+SCORE_HEIGHT = 144
+
+# Relative weight of each (per-clip standardised) score
+SCORE_WEIGHTS = {
+    'sharpness': 0.35,
+    'exposure': 0.2,
+    'contrast': 0.15,
+    'skin': 0.15,
+    'change': -0.15,  # motion blur / scene-cut frames make poor thumbnails
+}
+
+
+def _select_expression(ranges: list) -> str:
+    """select= expression keeping one frame per interval inside any range."""
+    in_range = '+'.join(f"between(t\\,{start:.3f}\\,{end:.3f})" for start, end in ranges)
+    spaced = f"isnan(prev_selected_t)+gte(t-prev_selected_t\\,{THUMBNAIL_SAMPLE_INTERVAL})"
+    return f"({in_range})*({spaced})"
+
+
+def extract_candidates(video_path: str, clips: list, work_dir: str):
+    """
+    Pull candidate frames for every clip range in a single FFmpeg run.
+
+    Args:
+        video_path: Path to source video
+        clips: Clip dicts with start_time and end_time
+        work_dir: Directory for the full-size candidate JPEGs
+
+    Returns:
+        Tuple (times, small_frames, jpeg_paths): source timestamps, an
+        (N, SCORE_HEIGHT, SCORE_WIDTH, 3) uint8 array, and one JPEG per frame
+    """
+    # Only decode the span that contains clips; timestamps restart at `offset`
+    offset = min(clip['start_time'] for clip in clips)
+    span_end = max(clip['end_time'] for clip in clips)
+    ranges = [(clip['start_time'] - offset, clip['end_time'] - offset) for clip in clips]
+
+    jpeg_pattern = os.path.join(work_dir, 'candidate_%05d.jpg')
+    cmd = [
+        'ffmpeg',
+        '-ss', str(offset),
+        '-t', str(span_end - offset),
+        '-i', video_path,
+        '-filter_complex',
+        f"[0:v]select='{_select_expression(ranges)}',showinfo,split=2[score][full];"
+        f"[score]scale={SCORE_WIDTH}:{SCORE_HEIGHT}[small];"
+        "[full]scale='min(iw\\,1920)':-2[large]",
+        '-map', '[small]', '-fps_mode', 'passthrough', '-f', 'rawvideo', '-pix_fmt', 'rgb24', 'pipe:1',
+        '-map', '[large]', '-fps_mode', 'passthrough', '-q:v', '2', '-y', jpeg_pattern,
+    ]
+
+    result = subprocess.run(cmd, capture_output=True, check=True)
+    stderr = result.stderr.decode('utf-8', errors='replace')
+    times = [
+        float(match) + offset
+        for match in re.findall(r'Parsed_showinfo.*?pts_time:\s*([-\d.]+)', stderr)
+    ]
+
+    frame_size = SCORE_WIDTH * SCORE_HEIGHT * 3
+    n_frames = len(result.stdout) // frame_size
+    frames = np.frombuffer(result.stdout[:n_frames * frame_size], dtype=np.uint8)
+    frames = frames.reshape(n_frames, SCORE_HEIGHT, SCORE_WIDTH, 3)
+
+    n = min(n_frames, len(times))
+    jpeg_paths = [jpeg_pattern % (i + 1) for i in range(n)]
+    return np.asarray(times[:n]), frames[:n], jpeg_paths
+
+
+def score_frames(frames: np.ndarray) -> dict:
+    """
+    Compute raw quality features for a stack of candidate frames.
+
+    Args:
+        frames: (N, H, W, 3) uint8 RGB frames
+
+    Returns:
+        Dict of (N,) float arrays keyed like SCORE_WEIGHTS
+    """
+    rgb = frames.astype(np.float32) / 255.0
+    gray = rgb @ np.array([0.299, 0.587, 0.114], dtype=np.float32)
+
+    laplacian = (
+        4 * gray[:, 1:-1, 1:-1]
+        - gray[:, :-2, 1:-1] - gray[:, 2:, 1:-1]
+        - gray[:, 1:-1, :-2] - gray[:, 1:-1, 2:]
+    )
+    sharpness = laplacian.reshape(len(frames), -1).var(axis=1)
+
+    brightness = gray.reshape(len(frames), -1).mean(axis=1)
+    exposure = 1.0 - np.abs(brightness - 0.5) * 2
+    contrast = gray.reshape(len(frames), -1).std(axis=1)
+
+    # Skin-tone share in the central area (YCbCr box), a cheap stand-in for faces
+    h, w = gray.shape[1:]
+    center = rgb[:, h // 6:h - h // 6, w // 6:w - w // 6] * 255
+    r, g, b = center[..., 0], center[..., 1], center[..., 2]
+    cb = 128 - 0.168736 * r - 0.331264 * g + 0.5 * b
+    cr = 128 + 0.5 * r - 0.418688 * g - 0.081312 * b
+    skin_mask = (cb >= 77) & (cb <= 127) & (cr >= 133) & (cr <= 173)
+    skin = skin_mask.reshape(len(frames), -1).mean(axis=1)
+
+    change = np.zeros(len(frames), dtype=np.float32)
+    if len(frames) > 1:
+        change[1:] = np.abs(np.diff(gray, axis=0)).reshape(len(frames) - 1, -1).mean(axis=1)
+
+    return {
+        'sharpness': sharpness,
+        'exposure': exposure,
+        'contrast': contrast,
+        'skin': skin,
+        'change': change,
+    }
+
+
+def pick_best_frames(times: np.ndarray, features: dict, clips: list) -> list:
+    """
+    Choose the highest-scoring candidate within each clip's range.
+
+    Features are standardised per clip so each clip competes only with itself.
+
+    Args:
+        times: Source timestamp of each candidate
+        features: Result of score_frames
+        clips: Clip dicts with start_time and end_time
+
+    Returns:
+        List with the chosen candidate index for each clip (None if it has none)
+    """
+    best = []
+    for clip in clips:
+        idx = np.nonzero((times >= clip['start_time']) & (times <= clip['end_time']))[0]
+        if len(idx) == 0:
+            best.append(None)
+            continue
+
+        # The change feature compares with the previous candidate, which may
+        # belong to another clip; don't count it for a clip's first frame
+        change = features['change'][idx].copy()
+        change[0] = np.median(change) if len(change) > 1 else 0.0
+
+        total = np.zeros(len(idx), dtype=np.float64)
+        for name, weight in SCORE_WEIGHTS.items():
+            values = change if name == 'change' else features[name][idx]
+            spread = values.std()
+            if spread > 0:
+                total += weight * (values - values.mean()) / spread
+        best.append(int(idx[np.argmax(total)]))
+    return best
+
+
+def render_thumbnails(jobs: list) -> list:
+    """
+    Burn titles into chosen stills and write every thumbnail in one FFmpeg run.
+
+    Args:
+        jobs: Dicts with 'image' (candidate JPEG), 'profile' (THUMBNAIL_PROFILES
+            entry), 'subtitles' (ASS title file) and 'output' (JPEG path)
+
+    Returns:
+        List of written thumbnail paths
+    """
+    cmd = ['ffmpeg']
+    for job in jobs:
+        cmd += ['-i', job['image']]
+
+    filters = []
+    for i, job in enumerate(jobs):
+        filters.append(build_profile_filter(f"[{i}:v]", job['profile'], f"t{i}", job['subtitles']))
+    cmd += ['-filter_complex', ';'.join(filters)]
+
+    for i, job in enumerate(jobs):
+        cmd += ['-map', f"[t{i}]", '-frames:v', '1', '-q:v', '2', '-y', job['output']]
+
+    subprocess.run(cmd, capture_output=True, check=True)
+    return [job['output'] for job in jobs]
+
+
+def generate_thumbnails(video_path: str, clips: list, output_dir: str) -> list:
+    """
+    Pick the best frame of each clip and save titled thumbnails.
+
+    Writes <video>_clip_NN_thumb.jpg (1280x720) and
+    <video>_clip_NN_thumb_9x16.jpg (1080x1920) with the clip's
+    thumbnail_text overlaid.
+
+    Args:
+        video_path: Path to source video
+        clips: Clip dicts with start_time, end_time and thumbnail_text
+        output_dir: Directory where to save thumbnails
+
+    Thumbnails are extras: if FFmpeg fails, a warning is printed and the
+    run carries on, as when a clip fails to cut.
+
+    Returns:
+        List of generated thumbnail paths (empty if FFmpeg failed)
+    """
+    if not clips:
+        return []
+
+    video_name = os.path.splitext(os.path.basename(video_path))[0]
+    print(f"\n⏳ Picking thumbnail frames for {len(clips)} clips...")
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        try:
+            times, frames, jpeg_paths = extract_candidates(video_path, clips, work_dir)
+        except subprocess.CalledProcessError as e:
+            print(f"  ✗ Failed to extract thumbnail frames: {e.stderr.decode('utf-8', errors='replace')}")
+            return []
+
+        best = pick_best_frames(times, score_frames(frames), clips)
+
+        jobs = []
+        for i, (clip, choice) in enumerate(zip(clips, best), 1):
+            if choice is None:
+                print(f"  ⚠ No frames found for clip {i}")
+                continue
+            print(f"  ✓ Clip {i}: frame at {times[choice]:.1f}s")
+            for profile in THUMBNAIL_PROFILES.values():
+                output_path = os.path.join(output_dir, f"{video_name}_clip_{i:02d}_{profile['suffix']}.jpg")
+                subtitles_path = os.path.join(work_dir, f"clip_{i:02d}_{profile['suffix']}.ass")
+                write_title_ass(
+                    clip.get('thumbnail_text', ''),
+                    subtitles_path,
+                    profile['width'],
+                    profile['height']
+                )
+                jobs.append({
+                    'image': jpeg_paths[choice],
+                    'profile': profile,
+                    'subtitles': subtitles_path,
+                    'output': output_path,
+                })
+
+        if not jobs:
+            return []
+
+        try:
+            return render_thumbnails(jobs)
+        except subprocess.CalledProcessError as e:
+            print(f"  ✗ Failed to render thumbnails: {e.stderr.decode('utf-8', errors='replace')}")
+            return []
@@ -5,15 +5,149 @@ Transcription module using OpenAI Whisper for speech-to-text conversion.
 import whisper
 import json
 import os
+import sys
+import wave
+from contextlib import contextmanager
+from types import ModuleType, SimpleNamespace
+import numpy as np
+from src.memory_budget import current_rss_mb
+from src.metrics import registry, ProgressTracker
+from src.voice_activity import splice_regions, remap_segments
 
+SAMPLE_RATE = 16000  # Whisper's input rate (matches extract_audio)
 
-def transcribe_audio(audio_path: str, model_name: str = "small") -> dict:
+# Low-memory mode: audio is transcribed in windows sized to the RSS budget
+AUDIO_BYTES_PER_SECOND = 512 * 1024  # Whisper's working memory per second of input (conservative)
+MIN_WINDOW_SECONDS = 30  # one Whisper context
+WINDOW_OVERLAP_SECONDS = 5  # segments ending this close to a window's end are redone in the next
+
+MEL_FRAMES_PER_SECOND = 100  # unit of Whisper's internal progress bar
+
+# Segment fields kept by low-memory mode (Whisper also returns tokens and
+# decoding stats that nothing downstream reads)
+SEGMENT_KEYS = ('start', 'end', 'text', 'words')
+
+
+def _wav_data_layout(audio_path: str):
+    """Byte offset of the sample data and number of samples in a 16-bit mono WAV."""
+    with wave.open(audio_path, 'rb') as wav:
+        if wav.getsampwidth() != 2 or wav.getnchannels() != 1:
+            raise ValueError(f"Expected 16-bit mono WAV: {audio_path}")
+        n_samples = wav.getnframes()
+
+    with open(audio_path, 'rb') as f:
+        f.seek(12)  # RIFF header
+        while True:
+            header = f.read(8)
+            if len(header) < 8:
+                raise ValueError(f"No data chunk in WAV file: {audio_path}")
+            chunk_size = int.from_bytes(header[4:], 'little')
+            if header[:4] == b'data':
+                return f.tell(), n_samples
+            f.seek(chunk_size + (chunk_size & 1), 1)
+
+
+def open_wav_samples(audio_path: str, start: float = 0.0, end: float = None) -> np.memmap:
+    """
+    Memory-map the samples of a 16-bit mono WAV file.
+
+    Slicing the result only reads that part of the file, so recordings never
+    have to be decoded into memory at once. Pages read through the map count
+    towards resident memory until it is released, so long files are best
+    mapped one window at a time via `start`/`end`.
+
+    Args:
+        audio_path: Path to WAV file (as produced by extract_audio)
+        start: First second to map
+        end: Second to stop at (default: end of file)
+
+    Returns:
+        Read-only int16 array of samples
+
+    Raises:
+        ValueError: If the file is not 16-bit mono PCM WAV
+    """
+    data_offset, n_samples = _wav_data_layout(audio_path)
+    first = min(int(start * SAMPLE_RATE), n_samples)
+    last = n_samples if end is None else min(int(end * SAMPLE_RATE), n_samples)
+    if last <= first:
+        return np.zeros(0, dtype='<i2')
+    return np.memmap(audio_path, dtype='<i2', mode='r', offset=data_offset + 2 * first, shape=(last - first,))
+
+
+def _to_float(samples: np.ndarray) -> np.ndarray:
+    """int16 samples as the float32 [-1, 1] array Whisper expects."""
+    audio = samples.astype(np.float32)
+    audio /= 32768.0
+    return audio
+
+
+@contextmanager
+def whisper_progress(tracker: ProgressTracker, offset: float = 0.0):
+    """
+    Feed Whisper's decoding position into a progress tracker.
+
+    Whisper has no progress callback. Its transcribe() advances a tqdm bar
+    after each decoded 30 s window (a handful of segments), so that bar is
+    swapped for one reporting to `tracker` while the block runs. Only the
+    `tqdm` name inside whisper.transcribe is rebound; the tqdm package
+    itself, and every other caller of it, is left alone.
+
+    Args:
+        tracker: Tracker covering the whole transcription
+        offset: Seconds already transcribed before this model.transcribe call
+    """
+    transcribe_module = sys.modules.get('whisper.transcribe')
+    original = getattr(transcribe_module, 'tqdm', None)
+    if original is None:
+        yield
+        return
+
+    class Bar:
+        def __init__(self, *args, **kwargs):
+            self.frames = 0
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+        def update(self, n=1):
+            self.frames += n
+            tracker.update(offset + self.frames / MEL_FRAMES_PER_SECOND)
+
+    # Whisper does `import tqdm` and calls tqdm.tqdm(...)
+    replacement = SimpleNamespace(tqdm=Bar) if isinstance(original, ModuleType) else Bar
+    transcribe_module.tqdm = replacement
+    try:
+        yield
+    finally:
+        transcribe_module.tqdm = original
+
+
+def _record_segments(tracker: ProgressTracker, n_segments: int):
+    """Close a transcription's tracker and count its segments."""
+    tracker.finish()
+    registry.inc('whisper_segments_total', n_segments, 'Transcript segments produced by Whisper')
+
+
+def transcribe_audio(
+    audio_path: str,
+    model_name: str = "small",
+    speech_regions: list = None,
+    word_timestamps: bool = False
+) -> dict:
     """
     Transcribe audio using OpenAI Whisper.
 
     Args:
         audio_path: Path to audio file
         model_name: Whisper model size (tiny, small, medium, large)
+        speech_regions: Optional (start, end) ranges from detect_speech_regions;
+            only these are transcribed and timestamps are mapped back onto
+            the original timeline
+        word_timestamps: Also return per-word timings in each segment's 'words'
 
     Returns:
         Dict with 'segments' containing timestamped text:
@@ -34,10 +168,261 @@ def transcribe_audio(audio_path: str, model_name: str = "small") -> dict:
     print(f"Loading Whisper model '{model_name}'...")
     model = whisper.load_model(model_name)
 
-    print("Transcribing audio...")
-    result = model.transcribe(audio_path, verbose=False)
+    if speech_regions is None:
+        print("Transcribing audio...")
+        try:
+            duration = _wav_data_layout(audio_path)[1] / SAMPLE_RATE
+        except (ValueError, EOFError, wave.Error):
+            duration = None  # not a WAV from extract_audio; no ETA
+        tracker = ProgressTracker('transcribe', duration, 'Transcribing')
+        with whisper_progress(tracker):
+            result = model.transcribe(audio_path, verbose=False, word_timestamps=word_timestamps)
+        _record_segments(tracker, len(result['segments']))
+        return result
+
+    print(f"Transcribing {len(speech_regions)} speech region(s)...")
+    spliced, timeline = splice_regions(open_wav_samples(audio_path), speech_regions, SAMPLE_RATE)
+    if len(spliced) == 0:
+        return merge_segments([])
+
+    tracker = ProgressTracker('transcribe', len(spliced) / SAMPLE_RATE, 'Transcribing')
+    with whisper_progress(tracker):
+        result = model.transcribe(_to_float(spliced), verbose=False, word_timestamps=word_timestamps)
+    _record_segments(tracker, len(result['segments']))
+    return merge_segments(remap_segments(result['segments'], timeline), result.get('language'))
+
+
+def shift_segments(segments: list, delta: float) -> list:
+    """
+    Move segments (and their word timings, if any) along the timeline.
+
+    Args:
+        segments: Whisper segment dicts
+        delta: Seconds to add to every timestamp
+
+    Returns:
+        New list of shifted segment dicts
+    """
+    shifted = []
+    for seg in segments:
+        seg = dict(seg, start=seg['start'] + delta, end=seg['end'] + delta)
+        if 'words' in seg:
+            seg['words'] = [
+                dict(word, start=word['start'] + delta, end=word['end'] + delta)
+                for word in seg['words']
+            ]
+        shifted.append(seg)
+    return shifted
+
+
+def merge_segments(segments: list, language: str = None) -> dict:
+    """
+    Build a transcript dict from segments gathered out of order.
+
+    Args:
+        segments: Segment dicts on the original timeline
+        language: Detected language to record, if known
+
+    Returns:
+        Transcript dict with sorted, renumbered segments and joined text
+    """
+    segments = sorted(segments, key=lambda seg: seg['start'])
+    for i, seg in enumerate(segments):
+        seg['id'] = i
+
+    transcript = {
+        "text": "".join(seg['text'] for seg in segments),
+        "segments": segments,
+    }
+    if language:
+        transcript["language"] = language
+    return transcript
+
 
-    return result
+def transcribe_regions(
+    audio_path: str,
+    regions: list,
+    model_name: str = "small",
+    word_timestamps: bool = False
+) -> dict:
+    """
+    Transcribe only the given time ranges of an audio file.
+
+    Each region is transcribed on its own and its timestamps are shifted back
+    onto the original timeline.
+
+    Args:
+        audio_path: Path to audio file
+        regions: List of (start, end) tuples in seconds
+        model_name: Whisper model size (tiny, small, medium, large)
+        word_timestamps: Also return per-word timings in each segment's 'words'
+
+    Returns:
+        Transcript dict in the same shape as transcribe_audio, covering only
+        the regions
+
+    Raises:
+        FileNotFoundError: If audio file doesn't exist
+    """
+    if not os.path.exists(audio_path):
+        raise FileNotFoundError(f"Audio file not found: {audio_path}")
+
+    if not regions:
+        return merge_segments([])
+
+    print(f"Loading Whisper model '{model_name}'...")
+    model = whisper.load_model(model_name)
+    samples = open_wav_samples(audio_path)
+
+    segments = []
+    language = None
+    print(f"Transcribing {len(regions)} audio region(s)...")
+    tracker = ProgressTracker('transcribe', sum(end - start for start, end in regions), 'Transcribing')
+    done = 0.0
+    for start, end in regions:
+        chunk = samples[int(start * SAMPLE_RATE):int(end * SAMPLE_RATE)]
+        if len(chunk) == 0:
+            continue
+        with whisper_progress(tracker, done):
+            result = model.transcribe(_to_float(chunk), verbose=False, word_timestamps=word_timestamps)
+        done += end - start
+        language = language or result.get('language')
+        segments.extend(shift_segments(result['segments'], start))
+
+    _record_segments(tracker, len(segments))
+    return merge_segments(segments, language)
+
+
+def transcribe_low_memory(
+    audio_path: str,
+    model_name: str,
+    memory_budget_mb: float,
+    segments_path: str,
+    speech_regions: list = None,
+    word_timestamps: bool = False,
+    max_window_seconds: float = 300
+) -> dict:
+    """
+    Transcribe long audio within a resident memory budget.
+
+    Each window of the WAV is memory-mapped on its own and transcribed (the
+    whole file, or the speech regions split into windows). The window length is the smaller of
+    `max_window_seconds` and what fits in the budget next to the loaded model,
+    and is halved if the budget is still exceeded. A segment ending close to
+    a window's end is transcribed again as part of the next window, so words
+    aren't cut at window boundaries.
+
+    Segments are appended to `segments_path` (one JSON object per line) as
+    each window finishes; only the current window's segments are held while
+    Whisper runs. Once the model is released, the transcript is read back
+    from that file, keeping only start, end, text and words per segment.
+
+    Args:
+        audio_path: Path to 16-bit mono WAV file
+        model_name: Whisper model size (tiny, small, medium, large)
+        memory_budget_mb: Resident memory budget for the whole process in MB
+        segments_path: JSON Lines file segments are streamed to (overwritten)
+        speech_regions: Optional (start, end) ranges to transcribe instead of
+            the whole file
+        word_timestamps: Also return per-word timings in each segment's 'words'
+        max_window_seconds: Longest window transcribed at once
+
+    Returns:
+        Transcript dict in the same shape as transcribe_audio
+
+    Raises:
+        FileNotFoundError: If audio file doesn't exist
+        MemoryError: If the model alone leaves no room for one window
+    """
+    if not os.path.exists(audio_path):
+        raise FileNotFoundError(f"Audio file not found: {audio_path}")
+
+    print(f"Loading Whisper model '{model_name}'...")
+    model = whisper.load_model(model_name)
+
+    duration = _wav_data_layout(audio_path)[1] / SAMPLE_RATE
+    spans = speech_regions if speech_regions is not None else [(0.0, duration)]
+
+    window_seconds = max_window_seconds
+    baseline_mb = current_rss_mb()
+    if baseline_mb is not None:
+        headroom_seconds = (memory_budget_mb - baseline_mb) * 1024 * 1024 / AUDIO_BYTES_PER_SECOND
+        if headroom_seconds < MIN_WINDOW_SECONDS:
+            raise MemoryError(
+                f"Memory budget of {memory_budget_mb:.0f} MB is too small: "
+                f"{baseline_mb:.0f} MB is in use after loading the '{model_name}' model"
+            )
+        window_seconds = min(max_window_seconds, headroom_seconds)
+    print(f"Transcribing in windows of up to {window_seconds:.0f}s "
+          f"(memory budget {memory_budget_mb:.0f} MB)...")
+
+    n_segments = 0
+    language = None
+    tracker = ProgressTracker('transcribe', sum(end - start for start, end in spans), 'Transcribing')
+    done = 0.0
+    with open(segments_path, 'w', encoding='utf-8') as segments_file:
+        for span_start, span_end in spans:
+            position = span_start
+            previous_text = None
+            while span_end - position > 0.05:
+                end = min(position + window_seconds, span_end)
+                window = open_wav_samples(audio_path, position, end)
+                chunk = _to_float(window)
+                del window  # unmap, so the window's pages leave resident memory
+                with whisper_progress(tracker, done):
+                    result = model.transcribe(
+                        chunk,
+                        verbose=False,
+                        word_timestamps=word_timestamps,
+                        initial_prompt=previous_text
+                    )
+                del chunk
+                language = language or result.get('language')
+                window_segments = shift_segments(result['segments'], position)
+
+                next_position = end
+                if end < span_end:
+                    kept = [seg for seg in window_segments if seg['end'] <= end - WINDOW_OVERLAP_SECONDS]
+                    if kept and kept[-1]['end'] > position + WINDOW_OVERLAP_SECONDS:
+                        window_segments = kept
+                        next_position = kept[-1]['end']
+
+                for seg in window_segments:
+                    slim = {key: seg[key] for key in SEGMENT_KEYS if key in seg}
+                    segments_file.write(json.dumps(slim, ensure_ascii=False) + "\n")
+                segments_file.flush()
+                n_segments += len(window_segments)
+
+                # Carry the last words over so Whisper keeps context across windows
+                previous_text = "".join(seg['text'] for seg in window_segments[-3:]) or None
+                done += next_position - position
+                position = next_position
+
+                rss_mb = current_rss_mb()
+                if rss_mb is not None and rss_mb > memory_budget_mb and window_seconds > MIN_WINDOW_SECONDS:
+                    window_seconds = max(MIN_WINDOW_SECONDS, window_seconds / 2)
+                    print(f"  ⚠ Using {rss_mb:.0f} MB, over the budget; "
+                          f"windows reduced to {window_seconds:.0f}s")
+
+    _record_segments(tracker, n_segments)
+    del model  # free the weights before the transcript is read back
+    return merge_segments(list(read_segments(segments_path)), language)
+
+
+def read_segments(segments_path: str):
+    """
+    Read segments back from a JSON Lines file written by transcribe_low_memory.
+
+    Args:
+        segments_path: Path to the segments file
+
+    Yields:
+        Segment dicts in the order they were written
+    """
+    with open(segments_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
 
 
 def save_transcript(transcript: dict, output_path: str):
@@ -0,0 +1,101 @@
+"""
+Shared transcript prefix for Claude requests with prompt caching.
+
+The metadata and highlight requests both need the whole transcript. When they
+start with the exact same content block, marked with `cache_control`, the
+second request reads the transcript from Claude's prompt cache instead of
+paying full price for those input tokens again.
+"""
+
+
+def format_duration_label(transcript: dict) -> str:
+    """
+    Format the transcript length as M:SS.
+
+    Args:
+        transcript: Whisper transcript dictionary
+
+    Returns:
+        Duration string, or "unknown" if there are no segments
+    """
+    segments = transcript.get('segments', [])
+    if not segments:
+        return "unknown"
+    duration_seconds = segments[-1]['end']
+    return f"{int(duration_seconds // 60)}:{int(duration_seconds % 60):02d}"
+
+
+def iter_segment_lines(segments):
+    """
+    Yield transcript segments as "[start - end] text" lines, one at a time.
+
+    Args:
+        segments: Any iterable of segment dicts (a list, or segments read
+            lazily from disk)
+
+    Yields:
+        One timestamped line per segment, without a trailing newline
+    """
+    for seg in segments:
+        yield f"[{seg['start']:.1f}s - {seg['end']:.1f}s] {seg['text']}"
+
+
+def format_segments(transcript: dict) -> str:
+    """
+    Format transcript segments as "[start - end] text" lines.
+
+    Args:
+        transcript: Whisper transcript dictionary
+
+    Returns:
+        Newline-joined timestamped segments
+    """
+    return "\n".join(iter_segment_lines(transcript.get('segments', [])))
+
+
+def build_transcript_block(transcript: dict, video_name: str) -> dict:
+    """
+    Build the cacheable content block shared by all requests for one video.
+
+    Args:
+        transcript: Whisper transcript dictionary
+        video_name: Name of the video file (without extension)
+
+    Returns:
+        Text content block with an ephemeral cache_control marker
+    """
+    text = f"""VIDEO INFORMATION:
+- File name: {video_name}
+- Duration: {format_duration_label(transcript)}
+
+TRANSCRIPT (timestamped segments):
+{format_segments(transcript)}"""
+
+    return {
+        "type": "text",
+        "text": text,
+        "cache_control": {"type": "ephemeral"}
+    }
+
+
+def build_cached_messages(transcript: dict, video_name: str, instructions: str) -> list:
+    """
+    Build a messages list of the shared transcript block followed by instructions.
+
+    Args:
+        transcript: Whisper transcript dictionary
+        video_name: Name of the video file (without extension)
+        instructions: Request-specific prompt that refers to the transcript above
+
+    Returns:
+        Messages list for the Messages API
+    """
+    return [
+        {
+            "role": "user",
+            "content": [
+                build_transcript_block(transcript, video_name),
+                {"type": "text", "text": instructions}
+            ]
+        }
+    ]
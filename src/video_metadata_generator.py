@@ -2,47 +2,20 @@
 Video metadata generation module for creating full video YouTube content.
 """
 
-import anthropic
 import json
 import re
-from config import get_api_key
+from src.llm_gateway import create_message
+from src.transcript_prefix import format_duration_label, build_cached_messages
 
 
-def generate_video_metadata(transcript: dict, video_name: str) -> dict:
+def build_metadata_instructions() -> str:
     """
-    Generate professional YouTube metadata for the full video.
-
-    Args:
-        transcript: Whisper transcript dictionary
-        video_name: Name of the video file (without extension)
+    Build the metadata fields and output format part of the metadata prompt.
 
     Returns:
-        Dict with title, description, tags, thumbnail_text, category suggestions
+        Instructions text (everything after the transcript)
     """
-    client = anthropic.Anthropic(api_key=get_api_key())
-
-    full_text = transcript.get('text', '')
-    segments = transcript.get('segments', [])
-
-    # Get video duration
-    if segments:
-        duration_seconds = segments[-1]['end']
-        duration_mins = int(duration_seconds // 60)
-        duration_secs = int(duration_seconds % 60)
-        duration_str = f"{duration_mins}:{duration_secs:02d}"
-    else:
-        duration_str = "unknown"
-
-    prompt = f"""You are an expert YouTube SEO specialist and content strategist. Analyze this complete video transcript and create professional YouTube metadata that will maximize views and engagement.
-
-VIDEO INFORMATION:
-- File name: {video_name}
-- Duration: {duration_str}
-
-FULL TRANSCRIPT:
-{full_text}
-
-Based on this content, generate comprehensive YouTube metadata:
+    return """Based on this content, generate comprehensive YouTube metadata:
 
 1. **title**: Professional YouTube title (50-70 characters, engaging, SEO-optimized, capitalize appropriately)
    - Include key themes or emotions
@@ -79,26 +52,65 @@ EXAMPLES OF GOOD OUTPUT:
 - category: "Music"
 
 Return your response as JSON ONLY (no other text):
-{{
+{
   "title": "Professional Title Here",
   "description": "Full description with multiple paragraphs and hashtags...",
   "tags": ["tag1", "tag2", "tag3", ...],
   "thumbnail_text": "THUMBNAIL TEXT",
   "category": "Music",
   "key_moments": [
-    {{"timestamp": "0:00", "description": "Intro/Hook"}},
-    {{"timestamp": "1:15", "description": "First Verse"}},
-    {{"timestamp": "2:30", "description": "Chorus Drop"}}
+    {"timestamp": "0:00", "description": "Intro/Hook"},
+    {"timestamp": "1:15", "description": "First Verse"},
+    {"timestamp": "2:30", "description": "Chorus Drop"}
   ]
-}}"""
+}"""
+
+
+def generate_video_metadata(transcript: dict, video_name: str, use_prompt_cache: bool = False) -> dict:
+    """
+    Generate professional YouTube metadata for the full video.
+
+    Args:
+        transcript: Whisper transcript dictionary
+        video_name: Name of the video file (without extension)
+        use_prompt_cache: Send the transcript as the shared cached prefix (see
+            transcript_prefix) so the highlights request can reuse it
+
+    Returns:
+        Dict with title, description, tags, thumbnail_text, category suggestions
+    """
+    instructions = build_metadata_instructions()
+
+    if use_prompt_cache:
+        messages = build_cached_messages(
+            transcript,
+            video_name,
+            "You are an expert YouTube SEO specialist and content strategist. Analyze the "
+            "complete video transcript above and create professional YouTube metadata that "
+            "will maximize views and engagement.\n\n" + instructions
+        )
+    else:
+        full_text = transcript.get('text', '')
+        duration_str = format_duration_label(transcript)
+
+        prompt = f"""You are an expert YouTube SEO specialist and content strategist. Analyze this complete video transcript and create professional YouTube metadata that will maximize views and engagement.
+
+VIDEO INFORMATION:
+- File name: {video_name}
+- Duration: {duration_str}
+
+FULL TRANSCRIPT:
+{full_text}
+
+{instructions}"""
+        messages = [{"role": "user", "content": prompt}]
 
     print("Generating full video metadata with Claude AI...")
-    message = client.messages.create(
+    message = create_message(
+        label="video_metadata",
         model="claude-sonnet-4-5-20250929",
         max_tokens=2048,
-        messages=[
-            {"role": "user", "content": prompt}
-        ]
+        messages=messages
     )
 
     # Parse Claude's response
@@ -4,6 +4,12 @@ Video processing module for extracting audio from video files using FFmpeg.
 
 import subprocess
 import os
+import re
+import threading
+from src.loudness import EBUR128_FILTER, PEAK_FILTER, parse_ebur128_log, save_loudness
+from src.metrics import ProgressTracker
+
+DURATION_PATTERN = re.compile(r'Duration: (\d+):(\d+):(\d+(?:\.\d+)?)')
 
 
 def check_ffmpeg_installed():
@@ -24,13 +30,98 @@ def check_ffmpeg_installed():
         return False
 
 
-def extract_audio(video_path: str, output_path: str) -> str:
+def escape_filter_path(path: str) -> str:
+    """
+    Escape a file path for use as an FFmpeg filter option value.
+
+    Args:
+        path: File path
+
+    Returns:
+        Path quoted for a filter_complex argument
+    """
+    path = path.replace('\\', '/')
+    return "'" + path.replace(':', '\\:').replace("'", "'\\''") + "'"
+
+
+def run_ffmpeg(cmd: list, task: str, duration: float = None, label: str = None) -> subprocess.CompletedProcess:
+    """
+    Run an FFmpeg command while tracking its progress.
+
+    `-progress pipe:1` is added to the command and its key=value reports are
+    parsed into position, speed and ETA (see metrics.ProgressTracker).
+
+    Args:
+        cmd: FFmpeg command line, starting with 'ffmpeg'
+        task: Metrics label for this kind of run (e.g. "extract_audio")
+        duration: Media seconds the command will process; read from the
+            input's "Duration:" line if not given
+        label: Text for the live progress line (default: task)
+
+    Returns:
+        CompletedProcess with FFmpeg's stderr as text
+
+    Raises:
+        subprocess.CalledProcessError: If FFmpeg exits with an error (stderr attached)
+    """
+    cmd = [cmd[0], '-progress', 'pipe:1', '-nostats', *cmd[1:]]
+    tracker = ProgressTracker(task, duration, label)
+    stderr_lines = []
+
+    def read_stderr(stream):
+        # Drained on its own thread so a chatty stderr can't block FFmpeg
+        for line in stream:
+            stderr_lines.append(line)
+            if tracker.total_seconds is None:
+                match = DURATION_PATTERN.search(line)
+                if match:
+                    hours, minutes, seconds = match.groups()
+                    tracker.total_seconds = int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+    process = subprocess.Popen(
+        cmd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        encoding='utf-8',
+        errors='replace'
+    )
+    stderr_thread = threading.Thread(target=read_stderr, args=(process.stderr,), daemon=True)
+    stderr_thread.start()
+
+    out_time = 0.0
+    speed = None
+    for line in process.stdout:
+        key, _, value = line.strip().partition('=')
+        if key in ('out_time_us', 'out_time_ms') and value.isdigit():
+            out_time = int(value) / 1_000_000  # both are microseconds
+        elif key == 'speed' and value.endswith('x'):
+            try:
+                speed = float(value[:-1])
+            except ValueError:
+                speed = None
+        elif key == 'progress':
+            tracker.update(out_time, speed)
+
+    returncode = process.wait()
+    stderr_thread.join()
+    tracker.finish(failed=returncode != 0)
+
+    stderr = ''.join(stderr_lines)
+    if returncode != 0:
+        raise subprocess.CalledProcessError(returncode, cmd, stderr=stderr)
+    return subprocess.CompletedProcess(cmd, returncode, stderr=stderr)
+
+
+def extract_audio(video_path: str, output_path: str, loudness_path: str = None) -> str:
     """
     Extract audio from video using FFmpeg.
 
     Args:
         video_path: Path to input video file
         output_path: Path for output audio file (should be .wav)
+        loudness_path: If given, also measure EBU R128 loudness of the
+            original audio in the same FFmpeg run and cache it here as JSON
 
     Returns:
         Path to extracted audio file
@@ -57,8 +148,38 @@ def extract_audio(video_path: str, output_path: str) -> str:
         output_path
     ]
 
+    if loudness_path:
+        # Decode once: split the audio into the WAV branch, a loudness meter
+        # and a per-frame true-peak meter
+        log_path = f"{loudness_path}.log"
+        peak_log_path = f"{loudness_path}.peak.log"
+        cmd = [
+            'ffmpeg',
+            '-i', video_path,
+            '-filter_complex',
+            f"[0:a:0]asplit=3[wav][meter][peak];"
+            f"[meter]{EBUR128_FILTER.format(path=escape_filter_path(log_path))}[metered];"
+            f"[peak]{PEAK_FILTER.format(path=escape_filter_path(peak_log_path))}[peaked]",
+            '-map', '[wav]',
+            '-acodec', 'pcm_s16le',  # WAV format
+            '-ar', '16000',  # 16kHz sample rate
+            '-ac', '1',  # Mono
+            '-y',  # Overwrite output
+            output_path,
+            '-map', '[metered]',
+            '-f', 'null', '-',
+            '-map', '[peaked]',
+            '-f', 'null', '-'
+        ]
+
     try:
-        subprocess.run(cmd, capture_output=True, check=True, text=True)
-        return output_path
+        run_ffmpeg(cmd, 'extract_audio', label='Extracting audio')
     except subprocess.CalledProcessError as e:
         raise RuntimeError(f"FFmpeg failed: {e.stderr}")
+
+    if loudness_path:
+        save_loudness(parse_ebur128_log(log_path, peak_log_path), loudness_path)
+        os.remove(log_path)
+        os.remove(peak_log_path)
+
+    return output_path
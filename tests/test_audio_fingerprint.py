@@ -0,0 +1,157 @@
+"""
+Re-upload detection on synthetic audio: a trimmed re-encode should match at
+the trim offset, a different track that shares only its intro should match
+just the intro, and unrelated audio should not match at all. Reuse with a
+memory budget must transcribe the new footage in bounded windows.
+"""
+
+import sys
+import types
+import wave
+
+import numpy as np
+import pytest
+
+# Fingerprinting never runs Whisper; let src.transcriber import without it
+sys.modules.setdefault('whisper', types.ModuleType('whisper'))
+
+from src import audio_fingerprint, transcriber  # noqa: E402
+from src.audio_fingerprint import (  # noqa: E402
+    compute_fingerprint, open_index, add_to_index, find_match, plan_reuse, reuse_transcript
+)
+
+SAMPLE_RATE = 16000
+
+# Covered spans end at the last aligned hash anchor, which may fall up to a
+# couple of seconds before the shared audio really stops
+MATCH_TOLERANCE = 2.0
+
+
+def _track(seed: int, seconds: float) -> np.ndarray:
+    """Back-to-back harmonic notes of random pitch and length, over light noise."""
+    rng = np.random.default_rng(seed)
+    audio = np.zeros(int(seconds * SAMPLE_RATE), dtype=np.float32)
+    position = 0
+    while position < len(audio):
+        n = int(rng.uniform(0.08, 0.3) * SAMPLE_RATE)
+        t = np.arange(n) / SAMPLE_RATE
+        f0 = rng.uniform(100, 300)
+        note = sum(np.sin(2 * np.pi * f0 * k * t + rng.uniform(0, 6)) * rng.uniform(0, 1) / k
+                   for k in range(1, 12))
+        note *= np.hanning(n) * rng.uniform(0.1, 0.5)
+        audio[position:position + n] += note[:len(audio) - position]
+        position += n
+    return audio + rng.normal(0, 0.005, len(audio)).astype(np.float32)
+
+
+def _write_wav(path, audio: np.ndarray) -> str:
+    with wave.open(str(path), 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(SAMPLE_RATE)
+        wav.writeframes((np.clip(audio, -1, 1) * 32767).astype(np.int16).tobytes())
+    return str(path)
+
+
+@pytest.fixture(scope='module')
+def indexed(tmp_path_factory):
+    """An index holding one 135 s video: a 15 s channel intro, then content."""
+    directory = tmp_path_factory.mktemp('fingerprints')
+    intro = _track(0, 15)
+    original = np.concatenate([intro, _track(1, 120)])
+    conn = open_index(str(directory / 'fingerprints.db'))
+    fingerprint = compute_fingerprint(_write_wav(directory / 'original.wav', original))
+    add_to_index(conn, 'original', fingerprint, 'original_transcript.json', 'base')
+    yield conn, directory, intro, original
+    conn.close()
+
+
+def test_trimmed_reupload_matches_at_offset(indexed):
+    conn, directory, intro, original = indexed
+    # Re-upload with the first 7 s cut and 20 s of new footage at the end
+    reupload = np.concatenate([original[7 * SAMPLE_RATE:], _track(3, 20)])
+    fingerprint = compute_fingerprint(_write_wav(directory / 'reupload.wav', reupload))
+
+    match = find_match(conn, fingerprint, 'base')
+
+    assert match['video_name'] == 'original'
+    assert match['offset'] == pytest.approx(7.0, abs=0.05)
+    start, end = match['covered'][0]
+    assert len(match['covered']) == 1
+    assert start < 1.0
+    assert end == pytest.approx(128.0, abs=MATCH_TOLERANCE)
+    # Only the appended footage is left for Whisper
+    _, new_regions = plan_reuse(match, fingerprint['duration'])
+    assert len(new_regions) == 1
+    assert new_regions[0][1] == pytest.approx(148.0, abs=0.1)
+
+    assert find_match(conn, fingerprint, 'large') is None
+
+
+def test_shared_intro_covers_only_the_intro(indexed):
+    conn, directory, intro, original = indexed
+    other = np.concatenate([intro, _track(2, 120)])
+    fingerprint = compute_fingerprint(_write_wav(directory / 'other.wav', other))
+
+    match = find_match(conn, fingerprint, 'base')
+
+    assert match['offset'] == pytest.approx(0.0, abs=0.05)
+    assert len(match['covered']) == 1
+    start, end = match['covered'][0]
+    assert start < 1.0
+    assert end == pytest.approx(15.0, abs=MATCH_TOLERANCE)
+
+
+def test_unrelated_audio_does_not_match(indexed):
+    conn, directory, intro, original = indexed
+    fingerprint = compute_fingerprint(_write_wav(directory / 'unrelated.wav', _track(4, 135)))
+
+    assert find_match(conn, fingerprint, 'base') is None
+
+
+
+class StubModel:
+    """Records the length of each array Whisper would be given."""
+
+    def __init__(self):
+        self.chunk_seconds = []
+
+    def transcribe(self, audio, **kwargs):
+        seconds = len(audio) / SAMPLE_RATE
+        self.chunk_seconds.append(seconds)
+        return {'language': 'en', 'segments': [{'start': 0.0, 'end': seconds, 'text': ' new'}]}
+
+
+def test_reuse_with_memory_budget_transcribes_in_windows(indexed, tmp_path, monkeypatch):
+    conn, directory, intro, original = indexed
+    reupload = np.concatenate([original[7 * SAMPLE_RATE:], _track(3, 20)])
+    audio_path = _write_wav(tmp_path / 'reupload.wav', reupload)
+    fingerprint = compute_fingerprint(audio_path)
+    match = find_match(conn, fingerprint, 'base')
+    previous = {'language': 'en', 'segments': [
+        {'start': 20.0, 'end': 25.0, 'text': ' shared'},
+    ]}
+
+    model = StubModel()
+    monkeypatch.setattr(transcriber, 'whisper', types.SimpleNamespace(load_model=lambda name: model))
+
+    def whole_regions(*args, **kwargs):
+        raise AssertionError("new regions were loaded whole")
+
+    monkeypatch.setattr(audio_fingerprint, 'transcribe_regions', whole_regions)
+
+    transcript = reuse_transcript(
+        match, previous, audio_path, fingerprint['duration'], 'base',
+        memory_budget_mb=100000,
+        segments_path=str(tmp_path / 'segments.jsonl'),
+        max_window_seconds=5
+    )
+
+    # Only the ~20 s of appended footage reaches Whisper, at most 5 s at a time
+    assert sum(model.chunk_seconds) == pytest.approx(20.0, abs=MATCH_TOLERANCE)
+    assert max(model.chunk_seconds) <= 5.0
+    assert len(model.chunk_seconds) >= 4
+    texts = [seg['text'] for seg in transcript['segments']]
+    assert texts[0] == ' shared'
+    assert transcript['segments'][0]['start'] == pytest.approx(13.0, abs=0.05)
+    assert set(texts[1:]) == {' new'}
@@ -0,0 +1,95 @@
+"""
+Caption timing: range lookups over overlapping segments, clip-relative word
+times at clip boundaries, and the ASS time and karaoke formatting.
+"""
+
+import random
+
+import pytest
+
+from src.captions import SegmentIndex, words_for_clip, write_ass
+
+# A long segment (0-100 s) that overlaps several later short ones
+TRANSCRIPT = {
+    'segments': [
+        {'start': 20.0, 'end': 22.0, 'text': ' twenty'},
+        {'start': 0.0, 'end': 100.0, 'text': ' the long one'},
+        {'start': 10.0, 'end': 12.0, 'text': ' ten'},
+        {'start': 50.0, 'end': 52.0, 'text': ' fifty'},
+        {'start': 110.0, 'end': 112.0, 'text': ' one ten'},
+    ]
+}
+
+
+def _texts(segments):
+    return [seg['text'] for seg in segments]
+
+
+def test_long_segment_is_found_past_later_short_ones():
+    index = SegmentIndex(TRANSCRIPT)
+
+    assert _texts(index.segments_between(19.0, 30.0)) == [' the long one', ' twenty']
+    assert _texts(index.segments_between(60.0, 70.0)) == [' the long one']
+    assert _texts(index.segments_between(100.0, 110.0)) == []
+    assert _texts(index.segments_between(99.0, 111.0)) == [' the long one', ' one ten']
+
+
+def test_segments_between_matches_a_full_scan():
+    rng = random.Random(0)
+    segments = []
+    for _ in range(300):
+        start = rng.uniform(0, 1000)
+        segments.append({'start': start, 'end': start + rng.choice([0.5, 3.0, 40.0, 200.0]), 'text': ''})
+    index = SegmentIndex({'segments': segments})
+
+    for _ in range(200):
+        start = rng.uniform(0, 1100)
+        end = start + rng.uniform(1, 90)
+        expected = [seg for seg in index.segments if seg['end'] > start and seg['start'] < end]
+        assert index.segments_between(start, end) == expected
+
+
+def test_clip_boundary_cuts_through_a_segment():
+    transcript = {'segments': [{
+        'start': 5.0, 'end': 6.6, 'text': ' one two three',
+        'words': [
+            {'word': ' one', 'start': 5.0, 'end': 5.4},
+            {'word': ' two', 'start': 5.5, 'end': 5.9},
+            {'word': ' three', 'start': 6.0, 'end': 6.6},
+        ],
+    }]}
+
+    words = words_for_clip(SegmentIndex(transcript), 5.7, 6.3)
+
+    # Times are relative to the clip start and clamped to the clip
+    assert [text for text, _, _ in words] == ['two', 'three']
+    assert words[0][1:] == pytest.approx((0.0, 0.2))
+    assert words[1][1:] == pytest.approx((0.3, 0.6))
+
+
+def test_words_without_timings_are_spread_over_the_segment():
+    transcript = {'segments': [{'start': 10.0, 'end': 12.0, 'text': ' a b c d'}]}
+
+    words = words_for_clip(SegmentIndex(transcript), 9.0, 20.0)
+
+    assert [(text, round(start, 2), round(end, 2)) for text, start, end in words] == [
+        ('a', 1.0, 1.5), ('b', 1.5, 2.0), ('c', 2.0, 2.5), ('d', 2.5, 3.0)
+    ]
+
+
+def test_write_ass_times_and_karaoke(tmp_path):
+    words = [
+        ('Hello', 0.0, 0.4), ('big', 0.5, 0.9), ('{world}', 1.0, 1.5),
+        ('again', 3.0, 3.4),  # after a pause: new line
+        ('late', 3725.456, 3725.9),
+    ]
+
+    path = write_ass(words, str(tmp_path / 'clip.ass'), 1080, 1920)
+
+    with open(path, encoding='utf-8') as f:
+        dialogue = [line for line in f.read().splitlines() if line.startswith('Dialogue:')]
+    assert dialogue == [
+        r'Dialogue: 0,0:00:00.00,0:00:01.50,Caption,,0,0,0,,{\kf50}Hello {\kf50}big {\kf50}(world)',
+        r'Dialogue: 0,0:00:03.00,0:00:03.40,Caption,,0,0,0,,{\kf40}again',
+        r'Dialogue: 0,1:02:05.46,1:02:05.90,Caption,,0,0,0,,{\kf44}late',
+    ]
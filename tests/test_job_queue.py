@@ -0,0 +1,113 @@
+"""
+Worker-mode tests: several worker processes sharing one job directory,
+including a worker that dies mid-job and leaves its lease behind.
+"""
+
+import json
+import multiprocessing
+import os
+import time
+
+from src.job_queue import (
+    claim_job, init_job_dir, read_lease, reclaim_expired_leases, renew_lease,
+    run_worker, submit_job,
+)
+
+LEASE_TTL = 1.0
+HEARTBEAT_INTERVAL = 0.2
+POLL_INTERVAL = 0.05
+
+
+def _record(log_path: str, job: dict):
+    # O_APPEND writes of one short line don't interleave between processes
+    with open(log_path, 'a', encoding='utf-8') as f:
+        f.write(job['job_id'] + '\n')
+
+
+def _worker(job_dir: str, log_path: str, worker_id: str):
+    def process_job(job):
+        time.sleep(0.05)
+        _record(log_path, job)
+
+    run_worker(
+        job_dir, process_job, worker_id=worker_id, lease_ttl=LEASE_TTL,
+        heartbeat_interval=HEARTBEAT_INTERVAL, poll_interval=POLL_INTERVAL,
+        exit_when_idle=True
+    )
+
+
+def _crashing_worker(job_dir: str, started_path: str):
+    def process_job(job):
+        _record(started_path, job)
+        os._exit(1)  # die without releasing the lease
+
+    run_worker(
+        job_dir, process_job, worker_id='crasher', lease_ttl=LEASE_TTL,
+        heartbeat_interval=HEARTBEAT_INTERVAL, poll_interval=POLL_INTERVAL
+    )
+
+
+def _read_lines(path: str) -> list:
+    if not os.path.exists(path):
+        return []
+    with open(path, 'r', encoding='utf-8') as f:
+        return f.read().split()
+
+
+def _run(target, *args):
+    process = multiprocessing.get_context('fork').Process(target=target, args=args)
+    process.start()
+    return process
+
+
+def test_workers_finish_every_job_exactly_once(tmp_path):
+    job_dir = str(tmp_path / 'jobs')
+    log_path = str(tmp_path / 'processed.log')
+    started_path = str(tmp_path / 'crashed.log')
+    job_ids = [submit_job(job_dir, f"video_{i}.mp4") for i in range(20)]
+
+    crasher = _run(_crashing_worker, job_dir, started_path)
+    crasher.join(timeout=10)
+    assert crasher.exitcode == 1
+    crashed = _read_lines(started_path)
+    assert len(crashed) == 1
+    assert read_lease(job_dir, crashed[0])['worker_id'] == 'crasher'
+
+    workers = [_run(_worker, job_dir, log_path, f"worker-{i}") for i in range(4)]
+    for worker in workers:
+        worker.join(timeout=60)
+        assert worker.exitcode == 0
+
+    processed = _read_lines(log_path)
+    assert sorted(processed) == sorted(job_ids)
+    assert sorted(name[:-len('.json')] for name in os.listdir(os.path.join(job_dir, 'done'))) == sorted(job_ids)
+    assert os.listdir(os.path.join(job_dir, 'pending')) == []
+    assert os.listdir(os.path.join(job_dir, 'leases')) == []
+    assert os.listdir(os.path.join(job_dir, 'failed')) == []
+
+
+def test_failing_job_is_marked_failed(tmp_path):
+    job_dir = str(tmp_path / 'jobs')
+    job_id = submit_job(job_dir, 'broken.mp4')
+
+    def process_job(job):
+        raise RuntimeError('FFmpeg failed')
+
+    assert run_worker(job_dir, process_job, worker_id='w', exit_when_idle=True) == 0
+    with open(os.path.join(job_dir, 'failed', f"{job_id}.json"), encoding='utf-8') as f:
+        assert json.load(f)['error'] == 'RuntimeError: FFmpeg failed'
+
+
+def test_renew_never_overwrites_a_new_owners_lease(tmp_path):
+    job_dir = str(tmp_path / 'jobs')
+    init_job_dir(job_dir)
+    job_id = submit_job(job_dir, 'video.mp4')
+
+    assert claim_job(job_dir, job_id, 'a', LEASE_TTL)
+    assert reclaim_expired_leases(job_dir, now=time.time() + 10) == [job_id]
+    assert claim_job(job_dir, job_id, 'b', LEASE_TTL)
+
+    assert not renew_lease(job_dir, job_id, 'a', LEASE_TTL)
+    assert read_lease(job_dir, job_id)['worker_id'] == 'b'
+    assert renew_lease(job_dir, job_id, 'b', LEASE_TTL)
+
@@ -0,0 +1,100 @@
+"""
+Incremental library indexing: a rescan only re-indexes files that changed,
+deleted files leave no stale hits, and results carry snippet and timestamps.
+"""
+
+import json
+import os
+
+import pytest
+
+from src.library_index import open_library, update_library, search_library
+
+
+def _write_json(path, data):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+
+
+@pytest.fixture
+def library(tmp_path):
+    transcripts = tmp_path / 'transcripts'
+    reports = tmp_path / 'reports'
+    transcripts.mkdir()
+    reports.mkdir()
+    _write_json(transcripts / 'cooking_transcript.json', {'segments': [
+        {'start': 0.0, 'end': 4.0, 'text': ' Welcome to the kitchen.'},
+        {'start': 61.5, 'end': 66.0, 'text': ' Now we caramelize the onions slowly over low heat.'},
+    ]})
+    _write_json(reports / 'cooking_clips.json', {
+        'video_name': 'cooking',
+        'video_path': '/videos/cooking.mp4',
+        'clips': [{'start_time': 60.0, 'end_time': 90.0, 'title': 'Perfect Onions Every Time'}],
+    })
+    _write_json(transcripts / 'hiking_transcript.json', {'segments': [
+        {'start': 12.0, 'end': 15.0, 'text': ' The summit is just past this ridge.'},
+    ]})
+    conn = open_library(str(tmp_path / 'library.db'))
+    yield conn, [str(transcripts), str(reports)], transcripts
+    conn.close()
+
+
+def test_first_index_and_unchanged_rescan(library):
+    conn, directories, _ = library
+
+    assert update_library(conn, directories) == {'scanned': 3, 'indexed': 3, 'unchanged': 0, 'removed': 0}
+    assert update_library(conn, directories) == {'scanned': 3, 'indexed': 0, 'unchanged': 3, 'removed': 0}
+
+
+def test_touched_file_with_same_content_is_not_reindexed(library):
+    conn, directories, transcripts = library
+    update_library(conn, directories)
+    path = transcripts / 'hiking_transcript.json'
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    assert update_library(conn, directories)['indexed'] == 0
+    assert len(search_library(conn, 'summit')) == 1
+
+
+def test_changed_file_is_reindexed(library):
+    conn, directories, transcripts = library
+    update_library(conn, directories)
+    _write_json(transcripts / 'hiking_transcript.json', {'segments': [
+        {'start': 30.0, 'end': 33.0, 'text': ' A waterfall appears below the trail.'},
+    ]})
+
+    counts = update_library(conn, directories)
+
+    assert (counts['indexed'], counts['unchanged']) == (1, 2)
+    assert search_library(conn, 'summit') == []
+    assert [r['start_time'] for r in search_library(conn, 'waterfall')] == [30.0]
+
+
+def test_deleted_file_leaves_no_stale_hits(library):
+    conn, directories, transcripts = library
+    update_library(conn, directories)
+    os.remove(transcripts / 'hiking_transcript.json')
+
+    counts = update_library(conn, directories)
+
+    assert (counts['scanned'], counts['removed']) == (2, 1)
+    assert search_library(conn, 'summit ridge') == []
+    assert len(search_library(conn, 'onions')) == 2
+
+
+def test_search_result_snippet_and_timestamps(library):
+    conn, directories, _ = library
+    update_library(conn, directories)
+
+    results = search_library(conn, 'caramelized onion')
+
+    assert len(results) == 1
+    result = results[0]
+    assert result['video_name'] == 'cooking'
+    assert result['video_path'] == '/videos/cooking.mp4'
+    assert result['kind'] == 'transcript'
+    assert (result['start_time'], result['end_time']) == (61.5, 66.0)
+    # Stemmed matches are marked in the snippet
+    assert '[caramelize]' in result['snippet']
+    assert '[onions]' in result['snippet']
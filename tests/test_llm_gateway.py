@@ -0,0 +1,242 @@
+"""
+Gateway tests against a local stand-in for the Messages API that injects
+429/529 responses with retry-after headers, and checks that the shared
+request/token buckets and the concurrency cap pace calls.
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import anthropic
+import pytest
+
+from src import llm_gateway
+from src.llm_gateway import LLMMetrics, TokenBucket
+
+MESSAGE = {
+    'id': 'msg_test',
+    'type': 'message',
+    'role': 'assistant',
+    'model': 'claude-test',
+    'content': [{'type': 'text', 'text': 'ok'}],
+    'stop_reason': 'end_turn',
+    'stop_sequence': None,
+    'usage': {
+        'input_tokens': 120,
+        'output_tokens': 30,
+        'cache_read_input_tokens': 1000,
+        'cache_creation_input_tokens': 0,
+    },
+}
+
+
+class StandInServer:
+    """
+    Answers POST /v1/messages with scripted (status, retry-after) replies,
+    then success. Each reply takes `delay` seconds; the most requests seen
+    in flight at once is kept in `max_in_flight`.
+    """
+
+    def __init__(self, script, delay: float = 0.0):
+        self.script = list(script)
+        self.delay = delay
+        self.request_times = []
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get('content-length', 0)))
+                with server.lock:
+                    server.request_times.append(time.monotonic())
+                    server.in_flight += 1
+                    server.max_in_flight = max(server.max_in_flight, server.in_flight)
+                time.sleep(server.delay)
+                with server.lock:
+                    server.in_flight -= 1
+                if server.script:
+                    status, retry_after = server.script.pop(0)
+                    kind = 'rate_limit_error' if status == 429 else 'overloaded_error'
+                    body = {'type': 'error', 'error': {'type': kind, 'message': 'slow down'}}
+                    headers = {'retry-after': str(retry_after)}
+                else:
+                    status, body, headers = 200, MESSAGE, {}
+                payload = json.dumps(body).encode('utf-8')
+                self.send_response(status)
+                self.send_header('content-type', 'application/json')
+                self.send_header('content-length', str(len(payload)))
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_port}"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def gaps(self):
+        return [b - a for a, b in zip(self.request_times, self.request_times[1:])]
+
+
+@pytest.fixture
+def gateway(monkeypatch):
+    """Point a fresh gateway client and metrics at a stand-in server."""
+    servers = []
+
+    def start(script, delay=0.0):
+        server = StandInServer(script, delay)
+        servers.append(server)
+        monkeypatch.setenv('ANTHROPIC_API_KEY', 'test-key')
+        monkeypatch.setenv('ANTHROPIC_BASE_URL', server.url)
+        monkeypatch.setattr(llm_gateway, '_client', None)
+        monkeypatch.setattr(llm_gateway, 'metrics', LLMMetrics())
+        monkeypatch.setattr(llm_gateway, '_request_bucket', TokenBucket(6000))
+        monkeypatch.setattr(llm_gateway, '_token_bucket', TokenBucket(600000))
+        monkeypatch.setattr(llm_gateway, '_concurrency', threading.BoundedSemaphore(4))
+        # Keep jitter small so the delays under test come from retry-after
+        monkeypatch.setattr(llm_gateway, 'LLM_BACKOFF_BASE', 0.01)
+        return server
+
+    yield start
+    for server in servers:
+        server.httpd.shutdown()
+
+
+def _send(max_tokens=50):
+    return llm_gateway.create_message(
+        label='test',
+        model='claude-test',
+        max_tokens=max_tokens,
+        messages=[{'role': 'user', 'content': 'hello'}],
+    )
+
+
+def _empty_bucket(rate_per_minute):
+    bucket = TokenBucket(rate_per_minute)
+    bucket.level = 0.0
+    return bucket
+
+
+def test_retries_throttling_and_honours_retry_after(gateway):
+    server = gateway([(429, 0.3), (529, 0.2), (429, 0.1)])
+
+    message = _send()
+
+    assert message.content[0].text == 'ok'
+    assert len(server.request_times) == 4
+    for gap, retry_after in zip(server.gaps(), (0.3, 0.2, 0.1)):
+        assert gap >= retry_after
+
+    stats = llm_gateway.metrics.summary()
+    assert stats['calls'] == 1
+    assert stats['failed_calls'] == 0
+    assert stats['retries'] == 3
+    assert stats['input_tokens'] == 120
+    assert stats['output_tokens'] == 30
+    assert stats['cache_read_input_tokens'] == 1000
+    assert stats['latency_max'] >= 0.6
+
+    samples = {(name, tuple(labels.items())): value for name, _, value, labels in llm_gateway.metrics.collect()}
+    assert samples[('llm_calls_total', (('label', 'test'),))] == 1
+    assert samples[('llm_retries_total', ())] == 3
+    assert samples[('prompt_cache_hit_ratio', ())] == pytest.approx(1000 / 1120)
+
+
+def test_gives_up_after_max_retries(gateway, monkeypatch):
+    monkeypatch.setattr(llm_gateway, 'LLM_MAX_RETRIES', 2)
+    server = gateway([(429, 0.05)] * 5)
+
+    with pytest.raises(anthropic.RateLimitError):
+        _send()
+
+    assert len(server.request_times) == 3
+    stats = llm_gateway.metrics.summary()
+    assert (stats['calls'], stats['failed_calls'], stats['retries']) == (1, 1, 2)
+    assert stats['input_tokens'] == 0
+
+
+def test_metrics_memory_is_bounded():
+    metrics = LLMMetrics(window=10)
+    for i in range(1000):
+        metrics.record(label='test', ok=True, latency=float(i), retries=0, throttle_wait=0.0, input_tokens=1)
+    mark = metrics.mark()
+    metrics.record(label='test', ok=True, latency=5.0, retries=1, throttle_wait=0.0, input_tokens=1)
+
+    assert len(metrics.latencies) == 10
+    assert metrics.summary()['calls'] == 1001
+    assert metrics.summary()['latency_max'] == 999.0
+    since = metrics.summary(since=mark)
+    assert (since['calls'], since['retries'], since['input_tokens']) == (1, 1, 1)
+    assert since['latency_max'] == 5.0
+
+
+def test_request_bucket_paces_calls(gateway, monkeypatch):
+    server = gateway([])
+    monkeypatch.setattr(llm_gateway, '_request_bucket', _empty_bucket(240))  # one every 0.25 s
+
+    for _ in range(3):
+        _send()
+
+    assert len(server.request_times) == 3
+    assert all(gap >= 0.2 for gap in server.gaps())
+    assert llm_gateway.metrics.summary()['throttle_wait_seconds'] >= 0.6
+
+
+def test_token_bucket_paces_calls(gateway, monkeypatch):
+    server = gateway([])
+    # 6000 tokens/min = 100/s; each request is estimated at 51 tokens
+    monkeypatch.setattr(llm_gateway, '_token_bucket', _empty_bucket(6000))
+
+    started = time.monotonic()
+    _send()
+
+    assert server.request_times[0] - started >= 0.45
+    assert llm_gateway.metrics.summary()['throttle_wait_seconds'] >= 0.45
+
+
+def test_concurrency_cap_limits_requests_in_flight(gateway, monkeypatch):
+    server = gateway([], delay=0.2)
+    monkeypatch.setattr(llm_gateway, '_concurrency', threading.BoundedSemaphore(2))
+
+    threads = [threading.Thread(target=_send) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=10)
+
+    assert len(server.request_times) == 6
+    assert server.max_in_flight == 2
+    assert llm_gateway.metrics.summary()['calls'] == 6
+
+
+def test_rejected_attempts_refund_their_tokens(gateway, monkeypatch):
+    server = gateway([(429, 0)] * 3)
+    # Room for two ~300-token requests per minute: without refunds the
+    # fourth attempt would wait about a minute for tokens
+    monkeypatch.setattr(llm_gateway, '_token_bucket', TokenBucket(600))
+
+    started = time.monotonic()
+    _send(max_tokens=300)
+
+    assert len(server.request_times) == 4
+    assert time.monotonic() - started < 5
+    assert llm_gateway.metrics.summary()['throttle_wait_seconds'] < 1
+
+
+def test_giving_up_refunds_tokens(gateway, monkeypatch):
+    monkeypatch.setattr(llm_gateway, 'LLM_MAX_RETRIES', 1)
+    gateway([(429, 0)] * 5)
+    bucket = TokenBucket(600)
+    monkeypatch.setattr(llm_gateway, '_token_bucket', bucket)
+
+    with pytest.raises(anthropic.RateLimitError):
+        _send(max_tokens=300)
+
+    assert bucket.level == pytest.approx(600, abs=5)
@@ -0,0 +1,34 @@
+"""
+Loudness stats measured during audio extraction: clip true peaks must come
+from the clip's own frames, not from louder audio earlier in the source.
+"""
+
+import shutil
+import subprocess
+
+import pytest
+
+from src.loudness import load_loudness, measure_range
+from src.video_processor import extract_audio
+
+pytestmark = pytest.mark.skipif(shutil.which('ffmpeg') is None, reason='FFmpeg not installed')
+
+
+def test_clip_true_peak_ignores_louder_audio_before_it(tmp_path):
+    # 2 s of a -18 dBFS tone, then 10 s at -44 dBFS
+    source = str(tmp_path / 'source.wav')
+    subprocess.run([
+        'ffmpeg', '-loglevel', 'error',
+        '-f', 'lavfi', '-i', 'sine=f=1000:r=48000:d=2',
+        '-f', 'lavfi', '-i', 'sine=f=1000:r=48000:d=10,volume=-26dB',
+        '-filter_complex', '[0][1]concat=n=2:v=0:a=1',
+        '-y', source
+    ], check=True)
+
+    loudness_path = str(tmp_path / 'loudness.json')
+    extract_audio(source, str(tmp_path / 'audio.wav'), loudness_path)
+    stats = load_loudness(loudness_path)
+
+    assert len(stats['TP']) == len(stats['t'])
+    assert measure_range(stats, 0, 2)['input_tp'] == pytest.approx(-18, abs=0.5)
+    assert measure_range(stats, 5, 10)['input_tp'] == pytest.approx(-44, abs=0.5)
@@ -0,0 +1,95 @@
+"""
+Low-memory transcription on a synthetic multi-hour recording: peak RSS must
+stay under the configured budget, although decoding the whole file as
+Whisper's float32 input would not fit in it.
+"""
+
+import json
+import os
+import subprocess
+import sys
+import textwrap
+import wave
+
+import numpy as np
+import pytest
+
+pytest.importorskip('resource')
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SAMPLE_RATE = 16000
+HOURS = 3
+BUDGET_MB = 450
+MODEL_MB = 150
+
+# Runs in a fresh interpreter so ru_maxrss only covers the transcription.
+# Whisper is replaced by a stub model that holds MODEL_MB of weights and
+# works on a float32 copy of each window, like the real one.
+CHILD = textwrap.dedent(f"""
+    import json, resource, sys, types
+    import numpy as np
+    sys.path.insert(0, {ROOT!r})
+
+    class StubModel:
+        def __init__(self):
+            self.weights = np.ones({MODEL_MB} * 1024 * 1024 // 4, dtype=np.float32)
+
+        def transcribe(self, audio, **kwargs):
+            features = np.abs(audio) * self.weights[0]
+            duration = len(audio) / {SAMPLE_RATE}
+            starts = np.arange(0.0, duration - 1.0, 10.0)
+            return {{
+                'language': 'en',
+                'segments': [
+                    {{'start': float(s), 'end': float(min(s + 8.0, duration)),
+                      'text': f' level {{features[int(s * {SAMPLE_RATE})]:.3f}}',
+                      'tokens': list(range(40)), 'avg_logprob': -0.2}}
+                    for s in starts
+                ],
+            }}
+
+    whisper = types.ModuleType('whisper')
+    whisper.load_model = lambda name: StubModel()
+    sys.modules['whisper'] = whisper
+
+    from src.transcriber import transcribe_low_memory
+    transcript = transcribe_low_memory(
+        sys.argv[1], 'stub', {BUDGET_MB}, sys.argv[2], max_window_seconds=300
+    )
+    print(json.dumps({{
+        'peak_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        'segments': len(transcript['segments']),
+        'last_end': transcript['segments'][-1]['end'],
+        'fields': sorted(transcript['segments'][0]),
+    }}))
+""")
+
+
+def _write_long_wav(path: str, seconds: int):
+    rng = np.random.default_rng(0)
+    with wave.open(path, 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(SAMPLE_RATE)
+        for _ in range(0, seconds, 60):
+            wav.writeframes(rng.integers(-3000, 3000, 60 * SAMPLE_RATE, dtype=np.int16).tobytes())
+
+
+@pytest.mark.skipif(not sys.platform.startswith('linux'), reason='ru_maxrss units and /proc are Linux-specific')
+def test_peak_rss_stays_under_budget(tmp_path):
+    duration = HOURS * 3600
+    audio_path = str(tmp_path / 'long_audio.wav')
+    _write_long_wav(audio_path, duration)
+    # The whole recording as float32 alone would exceed the budget
+    assert duration * SAMPLE_RATE * 4 / (1024 * 1024) > BUDGET_MB
+
+    result = subprocess.run(
+        [sys.executable, '-c', CHILD, audio_path, str(tmp_path / 'segments.jsonl')],
+        capture_output=True, text=True, check=True
+    )
+    stats = json.loads(result.stdout.strip().splitlines()[-1])
+
+    assert stats['peak_kb'] / 1024 < BUDGET_MB
+    assert stats['last_end'] >= duration - 10
+    assert stats['segments'] >= duration // 10 - 10
+    assert stats['fields'] == ['end', 'id', 'start', 'text']
@@ -0,0 +1,60 @@
+"""
+Prometheus rendering of the metrics registry: HELP/TYPE headers, summary
+_sum/_count samples and label value escaping.
+"""
+
+from src.metrics import MetricsRegistry
+
+
+def test_help_and_type_are_declared_once_per_metric():
+    registry = MetricsRegistry()
+    registry.inc('clips_total', 2, 'Clips cut', profile='vertical')
+    registry.inc('clips_total', 1, profile='square')
+    registry.set('queue_depth', 4)
+
+    lines = registry.render_prometheus().splitlines()
+
+    assert lines == [
+        '# HELP shorts_clips_total Clips cut',
+        '# TYPE shorts_clips_total counter',
+        'shorts_clips_total{profile="square"} 1',
+        'shorts_clips_total{profile="vertical"} 2',
+        '# TYPE shorts_queue_depth gauge',  # no description: no HELP line
+        'shorts_queue_depth 4',
+    ]
+
+
+def test_summary_exports_sum_and_count():
+    registry = MetricsRegistry()
+    registry.observe('stage_seconds', 1.5, 'Seconds per stage', stage='transcribe')
+    registry.observe('stage_seconds', 2.25, stage='transcribe')
+
+    lines = registry.render_prometheus().splitlines()
+
+    assert lines == [
+        '# HELP shorts_stage_seconds Seconds per stage',
+        '# TYPE shorts_stage_seconds summary',
+        'shorts_stage_seconds_count{stage="transcribe"} 2',
+        'shorts_stage_seconds_sum{stage="transcribe"} 3.75',
+    ]
+    assert registry.snapshot()['metrics']['stage_seconds_sum{stage="transcribe"}'] == 3.75
+
+
+def test_label_values_are_escaped():
+    registry = MetricsRegistry()
+    registry.set('progress_seconds', 1, video='C:\\clips\\"best"\nof')
+
+    sample = registry.render_prometheus().splitlines()[-1]
+
+    assert sample == 'shorts_progress_seconds{video="C:\\\\clips\\\\\\"best\\"\\nof"} 1'
+
+
+def test_collectors_are_read_and_failures_skipped():
+    registry = MetricsRegistry()
+    registry.add_collector(lambda: [('jobs', 'gauge', 3, {'state': 'queued'})])
+    registry.add_collector(lambda: 1 / 0)
+
+    assert registry.render_prometheus().splitlines() == [
+        '# TYPE shorts_jobs gauge',
+        'shorts_jobs{state="queued"} 3',
+    ]
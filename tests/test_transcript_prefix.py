@@ -0,0 +1,49 @@
+"""
+The highlight and metadata requests must start with the identical cached
+transcript block, or the second request misses Claude's prompt cache.
+"""
+
+from types import SimpleNamespace
+
+from src import highlight_analyzer, video_metadata_generator
+from src.transcript_prefix import build_transcript_block
+
+TRANSCRIPT = {
+    'text': ' Welcome back. Today we test the cache.',
+    'segments': [
+        {'start': 0.0, 'end': 2.4, 'text': ' Welcome back.'},
+        {'start': 2.4, 'end': 75.9, 'text': ' Today we test the cache.'},
+    ],
+}
+
+
+def _capture(monkeypatch, module, reply):
+    """Replace a module's create_message with one that records its messages."""
+    sent = []
+
+    def create_message(label, **kwargs):
+        sent.append(kwargs['messages'])
+        return SimpleNamespace(content=[SimpleNamespace(text=reply)])
+
+    monkeypatch.setattr(module, 'create_message', create_message)
+    return sent
+
+
+def test_highlight_and_metadata_requests_share_cached_prefix(monkeypatch):
+    highlights = _capture(monkeypatch, highlight_analyzer, '[]')
+    metadata = _capture(monkeypatch, video_metadata_generator, '{}')
+
+    highlight_analyzer.analyze_highlights(TRANSCRIPT, video_name='episode', use_prompt_cache=True)
+    video_metadata_generator.generate_video_metadata(TRANSCRIPT, 'episode', use_prompt_cache=True)
+
+    highlight_prefix = highlights[0][0]['content'][0]
+    metadata_prefix = metadata[0][0]['content'][0]
+    assert highlight_prefix == metadata_prefix
+    assert highlight_prefix == build_transcript_block(TRANSCRIPT, 'episode')
+    assert highlight_prefix['cache_control'] == {'type': 'ephemeral'}
+    assert '[2.4s - 75.9s]  Today we test the cache.' in highlight_prefix['text']
+    assert '- Duration: 1:15' in highlight_prefix['text']
+
+    # Only the instructions after the prefix differ
+    assert highlights[0][0]['content'][1] != metadata[0][0]['content'][1]
+    assert 'cache_control' not in highlights[0][0]['content'][1]
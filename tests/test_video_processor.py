@@ -0,0 +1,77 @@
+"""
+run_ffmpeg progress parsing against a fake ffmpeg that prints scripted
+`-progress pipe:1` reports and a "Duration:" line on stderr.
+"""
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+from src import video_processor
+from src.metrics import ProgressTracker, registry
+from src.video_processor import run_ffmpeg
+
+FAKE_FFMPEG = f"""#!{sys.executable}
+import sys
+sys.stderr.write("Input #0, mov,mp4, from 'in.mp4':\\n  Duration: 00:01:40.00, start: 0.0\\n")
+for block in (
+    "frame=10\\nout_time_us=25000000\\nspeed=2.5x\\nprogress=continue",
+    "out_time_ms=50000000\\nspeed=N/A\\nprogress=continue",
+    "out_time_us=N/A\\nspeed=3x\\nprogress=continue",
+    "out_time_us=100000000\\nspeed=4x\\nprogress=end",
+):
+    print(block, flush=True)
+if "fail" in sys.argv:
+    sys.stderr.write("in.mp4: Invalid data found\\n")
+    sys.exit(1)
+"""
+
+
+@pytest.fixture
+def fake_ffmpeg(tmp_path, monkeypatch):
+    path = tmp_path / 'ffmpeg'
+    path.write_text(FAKE_FFMPEG)
+    os.chmod(path, 0o755)
+
+    trackers = []
+
+    class RecordingTracker(ProgressTracker):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.updates = []
+            trackers.append(self)
+
+        def update(self, done_seconds, speed=None):
+            self.updates.append((done_seconds, speed))
+            super().update(done_seconds, speed)
+
+    monkeypatch.setattr(video_processor, 'ProgressTracker', RecordingTracker)
+    return str(path), trackers
+
+
+def test_progress_reports_are_parsed(fake_ffmpeg):
+    path, trackers = fake_ffmpeg
+
+    result = run_ffmpeg([path, '-i', 'in.mp4', 'out.wav'], 'test_progress')
+
+    assert result.args[:4] == [path, '-progress', 'pipe:1', '-nostats']
+    assert 'Duration: 00:01:40.00' in result.stderr
+    tracker = trackers[0]
+    # One update per report; out_time_ms is microseconds too, and an N/A
+    # value keeps the last known one
+    assert tracker.updates == [(25.0, 2.5), (50.0, 2.5), (50.0, 3.0), (100.0, 4.0)]
+    assert tracker.total_seconds == 100.0
+    assert registry.get('progress_seconds', task='test_progress') == 100.0
+
+
+def test_failure_raises_with_stderr(fake_ffmpeg):
+    path, _ = fake_ffmpeg
+    failures = registry.get('task_failures_total', task='test_failure')
+
+    with pytest.raises(subprocess.CalledProcessError) as error:
+        run_ffmpeg([path, '-i', 'in.mp4', 'fail'], 'test_failure', duration=100.0)
+
+    assert 'Invalid data found' in error.value.stderr
+    assert registry.get('task_failures_total', task='test_failure') == failures + 1
@@ -0,0 +1,84 @@
+"""
+Speech detection on synthetic audio: syllable-like voiced bursts should be
+kept, sustained harmonic chords and silence should not.
+"""
+
+import wave
+
+import numpy as np
+
+from src.voice_activity import detect_speech_regions, total_duration, intersect_regions
+
+SAMPLE_RATE = 16000
+VOWEL_FORMANTS = [(730, 1090, 2440), (270, 2290, 3010), (300, 870, 2240), (530, 1840, 2480)]
+
+
+def _speech_like(seconds: float, rng) -> np.ndarray:
+    """Voiced 'syllables' of 100-250 ms with formants, short gaps and pauses."""
+    pieces, length = [], 0
+    while length < seconds * SAMPLE_RATE:
+        for _ in range(rng.integers(3, 10)):
+            n = int(rng.uniform(0.1, 0.25) * SAMPLE_RATE)
+            f0 = rng.uniform(100, 200)
+            phase = 2 * np.pi * f0 * np.arange(n) / SAMPLE_RATE
+            formants = VOWEL_FORMANTS[rng.integers(len(VOWEL_FORMANTS))]
+            syllable = sum(
+                sum(np.exp(-((f0 * k - f) / (80 + 0.06 * f)) ** 2) for f in formants) * np.sin(k * phase)
+                for k in range(1, int(4000 / f0))
+            )
+            pieces += [syllable * np.hanning(n) * rng.uniform(0.05, 0.2),
+                       np.zeros(int(rng.uniform(0.01, 0.06) * SAMPLE_RATE))]
+        pieces.append(np.zeros(int(rng.uniform(0.2, 0.6) * SAMPLE_RATE)))
+        length = sum(len(piece) for piece in pieces)
+    return np.concatenate(pieces)[:int(seconds * SAMPLE_RATE)]
+
+
+def _chords(seconds: float, rng) -> np.ndarray:
+    """Held three-note chords with harmonics, changing every 1.5-3 s."""
+    scale = [261.6, 293.7, 329.6, 349.2, 392.0, 440.0, 493.9]
+    pieces, length = [], 0
+    while length < seconds * SAMPLE_RATE:
+        t = np.arange(int(rng.uniform(1.5, 3) * SAMPLE_RATE)) / SAMPLE_RATE
+        chord = sum(
+            np.sin(2 * np.pi * f * k * t) / k
+            for f in rng.choice(scale, 3, replace=False) for k in range(1, 9)
+        )
+        envelope = np.minimum(1, np.minimum(t / 0.02, (t[-1] - t) / 0.05))
+        pieces.append(chord * envelope * 0.05)
+        length += len(t)
+    return np.concatenate(pieces)[:int(seconds * SAMPLE_RATE)]
+
+
+def _write_wav(path, pieces):
+    samples = np.concatenate(pieces)
+    with wave.open(str(path), 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(SAMPLE_RATE)
+        wav.writeframes((np.clip(samples, -1, 1) * 32767).astype(np.int16).tobytes())
+
+
+def _silence(seconds: float, rng) -> np.ndarray:
+    return rng.normal(0, 1e-4, int(seconds * SAMPLE_RATE))
+
+
+def test_music_is_not_speech(tmp_path):
+    rng = np.random.default_rng(1)
+    path = tmp_path / 'music.wav'
+    _write_wav(path, [_silence(20, rng), _chords(60, rng), _silence(20, rng)])
+
+    assert detect_speech_regions(str(path)) == []
+
+
+def test_speech_is_kept_and_music_between_is_skipped(tmp_path):
+    rng = np.random.default_rng(2)
+    path = tmp_path / 'mixed.wav'
+    _write_wav(path, [
+        _silence(5, rng), _speech_like(30, rng), _chords(30, rng), _speech_like(20, rng), _silence(5, rng)
+    ])
+
+    regions = detect_speech_regions(str(path))
+
+    speech = [(5.0, 35.0), (65.0, 85.0)]
+    assert total_duration(intersect_regions(regions, speech)) > 0.9 * total_duration(speech)
+    assert total_duration(intersect_regions(regions, [(36.0, 64.0)])) == 0